@@ -8,6 +8,8 @@ import sqlite3
 import tempfile
 import uuid
 import glob
+import csv
+from contextlib import closing
 from io import BytesIO
 from fuzzy_logic_improved import TransactionCategorizer, Config
 from preprocess_bank_data import extract_values_column
@@ -34,6 +36,26 @@ def read_uploaded_file(file, sheet_name=None):
     else:
         raise ValueError("Unsupported file format")
 
+def backup_rules_to_csv(conn, csv_name):
+    # Stream the rules table straight to disk so memory stays flat however big the DB is
+    cur = conn.execute("SELECT * FROM rules")
+    cur.arraysize = 10_000
+    with open(csv_name, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow([col[0] for col in cur.description])
+        rows = cur.fetchmany()
+        while rows:
+            writer.writerows(rows)
+            rows = cur.fetchmany()
+
+def purge_rules_db(db_path):
+    # Back up then empty the rules table; the connection is always closed and
+    # the DELETE only commits once the backup has been written
+    csv_name = os.path.join(BACKUP_DIR, os.path.basename(db_path).replace(".db", ".csv"))
+    with closing(sqlite3.connect(db_path)) as conn, conn:
+        backup_rules_to_csv(conn, csv_name)
+        conn.execute("DELETE FROM rules")
+
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
@@ -119,36 +141,35 @@ def show_admin_dashboard():
     uploaded_csv = st.file_uploader("Upload CSV to import", type=["csv"])
     if uploaded_csv:
         df_new = pd.read_csv(uploaded_csv)
-        df_new.columns = df_new.columns.str.lower().str.strip()
+        df_new.columns = [str(col).lower().strip() for col in df_new.columns]
         if not {"description", "category"} <= set(df_new.columns):
             st.error("CSV must have 'description' and 'category'")
         else:
-            conn = sqlite3.connect(selected_db)
-            df_existing = pd.read_sql("SELECT description, category FROM rules", conn)
-            df_combined = pd.concat([df_existing, df_new]).drop_duplicates()
-            df_combined.to_sql("rules", conn, if_exists="replace", index=False)
-            conn.close()
+            # SQLite's unique index drops rules that are already present, so
+            # only the new rows are written and the existing table is never read
+            rows = df_new[["description", "category"]].dropna().itertuples(index=False, name=None)
+            with closing(sqlite3.connect(selected_db)) as conn, conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS rules (description TEXT, category TEXT)")
+                has_unique = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_rules_unique'"
+                ).fetchone()
+                if not has_unique:
+                    # Older DBs may hold duplicates; keep the first of each before indexing
+                    conn.execute(
+                        "DELETE FROM rules WHERE rowid NOT IN "
+                        "(SELECT MIN(rowid) FROM rules GROUP BY description, category)"
+                    )
+                    conn.execute("CREATE UNIQUE INDEX idx_rules_unique ON rules (description, category)")
+                conn.executemany("INSERT OR IGNORE INTO rules (description, category) VALUES (?, ?)", rows)
             st.success("Imported and deduplicated rules.")
 
     if st.button("Purge Selected DB"):
-        conn = sqlite3.connect(selected_db)
-        df = pd.read_sql("SELECT * FROM rules", conn)
-        csv_name = os.path.join(BACKUP_DIR, os.path.basename(selected_db).replace(".db", ".csv"))
-        df.to_csv(csv_name, index=False)
-        conn.execute("DELETE FROM rules")
-        conn.commit()
-        conn.close()
+        purge_rules_db(selected_db)
         st.success(f"Purged and backed up {selected_db}")
 
     if st.button("Purge All DBs"):
         for db in db_files:
-            conn = sqlite3.connect(db)
-            df = pd.read_sql("SELECT * FROM rules", conn)
-            csv_name = os.path.join(BACKUP_DIR, os.path.basename(db).replace(".db", ".csv"))
-            df.to_csv(csv_name, index=False)
-            conn.execute("DELETE FROM rules")
-            conn.commit()
-            conn.close()
+            purge_rules_db(db)
         st.success("All DBs purged and backed up.")
 
 # === STREAMLIT LAYOUT ===
@@ -1,10 +1,10 @@
 # === IMPORTS ===
 import pandas as pd  # Data manipulation library
+import numpy as np  # Array operations for the exact-match pass
 from rapidfuzz import process, fuzz  # Fast fuzzy string matching
 import re  # Regular expressions for text cleaning
 import sys  # Used for exiting with success/failure status
 import logging  # Logging infrastructure
-from functools import lru_cache  # For memoization of match function
 from dataclasses import dataclass  # For clean configuration structure
 from typing import Tuple, List, Dict, Optional  # Type annotations
 import time  # Measuring execution time
@@ -22,7 +22,7 @@ class Config:
     num_suggestions: int = 3  # Number of suggestions to generate
     auto_approve_threshold: int = 95  # Score to auto-approve a match
     chunk_size: int = 1000  # Unused, potentially for batch processing
-    cache_size: int = 1000  # Unused, default cache size (for lru_cache)
+    cache_size: int = 1000  # Unused, the match cache is unbounded per instance
 
 # === LOGGING SETUP ===
 def setup_logging():
@@ -43,29 +43,55 @@ def setup_logging():
     return logger  # Return configured logger
 
 # === ENHANCED CLEANING FUNCTIONS ===
+# Compiled once at import; the cleaners run for every transaction and rule.
+# Noise words, long digit runs and non-alphanumerics are removed in one scan.
+_RE_CLEAN = re.compile(r'\b(?:ref|payment|purchase|transaction|debit|credit|\d{4,})\b|[^a-z0-9 ]')
+_RE_NONALNUM = re.compile(r'[^a-z0-9 ]')
+_RE_SPACES = re.compile(r' {2,}')
+
 def enhanced_clean_description(text: str) -> str:
     """Enhanced cleaning with financial-specific preprocessing"""
     if not isinstance(text, str) or not text.strip():
         return ""
-    text = text.lower().strip()
-    text = re.sub(r'\b(ref|payment|purchase|transaction|debit|credit)\b', '', text)
-    text = re.sub(r'\b\d{4,}\b', '', text)
-    text = re.sub(r'[^a-z0-9 ]', '', text)
-    text = re.sub(r'\s+', ' ', text)
-    return text.strip()
+    return " ".join(_RE_CLEAN.sub('', text.lower()).split())
+
+def clean_description_series(texts: pd.Series) -> pd.Series:
+    """Column-wise enhanced_clean_description using pandas string methods"""
+    if not pd.api.types.is_string_dtype(texts):
+        # Numbers and other non-strings clean to "" as in the scalar version
+        texts = texts.astype(object).where(texts.map(lambda v: isinstance(v, str)))
+    cleaned = (
+        texts.str.lower()
+        .str.replace(_RE_CLEAN, "", regex=True)
+        .str.replace(_RE_SPACES, " ", regex=True)
+        .str.strip()
+    )
+    return cleaned.fillna("")
 
 def basic_clean_description(text: str) -> str:
     """Basic cleaning function (fallback)"""
     if not isinstance(text, str):
         return ""
     text = text.lower()
-    text = re.sub(r"[^a-z0-9 ]", "", text)
-    text = re.sub(r"\s+", " ", text)
-    return text.strip()
+    return " ".join(_RE_NONALNUM.sub("", text).split())
 
 # === HYBRID SCORER ===
-def hybrid_score(a: str, b: str, **kwargs) -> float:
-    return 0.6 * fuzz.token_set_ratio(a, b) + 0.4 * fuzz.partial_ratio(a, b)
+def hybrid_score(a: str, b: str, score_cutoff: Optional[float] = None, **kwargs) -> float:
+    """
+    0.6 * token_set_ratio + 0.4 * partial_ratio. process.extract/extractOne
+    pass their running score_cutoff in, so each part is given the smallest
+    score it still needs and rapidfuzz can give up on hopeless pairs early.
+    Pairs that cannot reach the cutoff score 0.
+    """
+    if not score_cutoff:
+        return 0.6 * fuzz.token_set_ratio(a, b) + 0.4 * fuzz.partial_ratio(a, b)
+
+    token_set = fuzz.token_set_ratio(a, b, score_cutoff=max(0.0, (score_cutoff - 40) / 0.6 - 1e-9))
+    needed = (score_cutoff - 0.6 * token_set) / 0.4 - 1e-9
+    if needed > 100:
+        return 0.0
+    partial = fuzz.partial_ratio(a, b, score_cutoff=max(0.0, needed))
+    return 0.6 * token_set + 0.4 * partial
 
 # === MAIN CATEGORIZER CLASS ===
 class TransactionCategorizer:
@@ -74,7 +100,8 @@ class TransactionCategorizer:
         self.logger = setup_logging()
         self.rule_map: Dict[str, str] = {}
         self.rule_keys: List[str] = []
-        self._match_cache = {}
+        # Best match per cleaned description; cleared whenever the rules change
+        self._match_cache: Dict[str, Tuple[str, float, str]] = {}
 
     def load_rules(self, rules_file: str = None, db_conn=None, table_name: str = "rules") -> bool:
         try:
@@ -91,18 +118,19 @@ class TransactionCategorizer:
             else:
                 raise ValueError("Must provide either rules_file or db_conn")
 
-            rules_df.columns = rules_df.columns.str.lower().str.strip()
+            rules_df.columns = [str(col).lower().strip() for col in rules_df.columns]
             required_cols = ["description", "category"]
             missing_cols = [col for col in required_cols if col not in rules_df.columns]
             if missing_cols:
                 raise ValueError(f"Missing columns: {missing_cols}")
 
             rules_df = rules_df.dropna(subset=["description", "category"])
-            rules_df["description_clean"] = rules_df["description"].apply(enhanced_clean_description)
+            rules_df["description_clean"] = clean_description_series(rules_df["description"])
             rules_df = rules_df[rules_df["description_clean"] != ""]
 
             self.rule_map = rules_df.set_index("description_clean")["category"].to_dict()
             self.rule_keys = list(self.rule_map.keys())
+            self._match_cache.clear()
             self.logger.info(f"Loaded {len(self.rule_keys)} categorisation rules.")
             return True
 
@@ -120,7 +148,7 @@ class TransactionCategorizer:
             if "Description" not in bank_df.columns:
                 raise ValueError("Missing 'Description' column in bank statement file")
 
-            bank_df["Description_Clean"] = bank_df["Description"].apply(enhanced_clean_description)
+            bank_df["Description_Clean"] = clean_description_series(bank_df["Description"])
             self.logger.info(f"Successfully loaded {len(bank_df)} transactions")
             return bank_df
 
@@ -128,9 +156,12 @@ class TransactionCategorizer:
             self.logger.error(f"Error loading bank statement: {e}")
             return None
 
-    @lru_cache(maxsize=1000)
     def _cached_match(self, desc_clean: str) -> Tuple[str, float, str]:
-        return self._get_best_match_internal(desc_clean)
+        result = self._match_cache.get(desc_clean)
+        if result is None:
+            result = self._get_best_match_internal(desc_clean)
+            self._match_cache[desc_clean] = result
+        return result
 
     def _get_best_match_internal(self, desc_clean: str) -> Tuple[str, float, str]:
         if not desc_clean or not self.rule_keys:
@@ -140,15 +171,16 @@ class TransactionCategorizer:
             return (self.rule_map[desc_clean], 100.0, desc_clean)
 
         try:
-            result = process.extractOne(desc_clean, self.rule_keys, scorer=hybrid_score)
+            # Rules below the threshold are never reported, so let extractOne
+            # skip them instead of fully scoring every rule
+            result = process.extractOne(
+                desc_clean, self.rule_keys, scorer=hybrid_score, score_cutoff=self.config.match_threshold
+            )
             if result is None:
                 return ("Uncategorised", 0.0, "")
 
             best_match, score, _ = result
-            if score >= self.config.match_threshold:
-                return (self.rule_map[best_match], score, best_match)
-            else:
-                return ("Uncategorised", score, best_match)
+            return (self.rule_map[best_match], score, best_match)
 
         except Exception as e:
             self.logger.warning(f"Error in fuzzy matching for '{desc_clean}': {e}")
@@ -159,10 +191,12 @@ class TransactionCategorizer:
         return self._cached_match(desc_clean)
 
     def get_top_suggestions(self, desc: str, num: int = None) -> Tuple[List[str], List[float]]:
+        return self._get_top_suggestions_clean(enhanced_clean_description(desc), num)
+
+    def _get_top_suggestions_clean(self, desc_clean: str, num: int = None) -> Tuple[List[str], List[float]]:
         if num is None:
             num = self.config.num_suggestions
 
-        desc_clean = enhanced_clean_description(desc)
         if not desc_clean or not self.rule_keys:
             return (["No Match"] * num, [0.0] * num)
 
@@ -178,7 +212,7 @@ class TransactionCategorizer:
             return suggestions, confidences
 
         except Exception as e:
-            self.logger.warning(f"Error getting suggestions for '{desc}': {e}")
+            self.logger.warning(f"Error getting suggestions for '{desc_clean}': {e}")
             return (["No Match"] * num, [0.0] * num)
 
     def should_auto_approve(self, category: str, score: float) -> bool:
@@ -188,46 +222,61 @@ class TransactionCategorizer:
         self.logger.info("Starting transaction categorization...")
         start_time = time.time()
 
-        categories = []
-        match_scores = []
-        matched_rules = []
-        auto_approved = []
-        suggestion_cols = [[] for _ in range(self.config.num_suggestions)]
-
-        total_transactions = len(bank_df)
-        processed = 0
+        num = self.config.num_suggestions
+        if "Description_Clean" in bank_df.columns:
+            desc_cleans = bank_df["Description_Clean"].fillna("")
+        else:
+            desc_cleans = clean_description_series(bank_df["Description"])
 
         try:
-            for idx, row in bank_df.iterrows():
-                desc = row["Description"]
-                category, score, matched_rule = self.get_best_match(desc)
-
-                categories.append(category)
-                match_scores.append(round(score, 2))
-                matched_rules.append(matched_rule)
-                auto_approved.append(self.should_auto_approve(category, score))
+            # Statements repeat the same merchants many times, so match each
+            # distinct description once and map the results back onto the rows
+            unique_cleans = pd.unique(desc_cleans)
+            n_unique = len(unique_cleans)
+
+            # Exact rule hits are resolved in one dict lookup pass; only the
+            # rest go through fuzzy matching
+            exact_cats = pd.Series(unique_cleans, dtype=object).map(self.rule_map)
+            hit = exact_cats.notna().to_numpy()
+            categories = exact_cats.fillna("").to_numpy(dtype=object)
+            match_scores = np.where(hit, 100.0, 0.0)
+            matched_rules = np.where(hit, unique_cleans, "").astype(object)
+            auto_approved = hit & (categories != "Uncategorised") & (100.0 >= self.config.auto_approve_threshold)
+            suggestion_cols = [np.full(n_unique, "", dtype=object) for _ in range(num)]
+
+            fuzzy_idx = np.flatnonzero(~hit)
+            for processed, i in enumerate(fuzzy_idx, 1):
+                desc_clean = unique_cleans[i]
+                category, score, matched_rule = self._cached_match(desc_clean)
+                categories[i] = category
+                match_scores[i] = round(score, 2)
+                matched_rules[i] = matched_rule
+                auto_approved[i] = self.should_auto_approve(category, score)
 
                 if category == "Uncategorised":
-                    suggestions, confidences = self.get_top_suggestions(desc)
-                    for i, (sugg, conf) in enumerate(zip(suggestions, confidences)):
-                        suggestion_cols[i].append(f"{sugg} ({conf}%)")
-                else:
-                    for i in range(self.config.num_suggestions):
-                        suggestion_cols[i].append("")
-
-                processed += 1
+                    suggestions, confidences = self._get_top_suggestions_clean(desc_clean)
+                    for col, (sugg, conf) in zip(suggestion_cols, zip(suggestions, confidences)):
+                        col[i] = f"{sugg} ({conf}%)"
+
                 if processed % 100 == 0:
-                    self.logger.info(f"Processed {processed}/{total_transactions} transactions")
+                    self.logger.info(f"Fuzzy matched {processed}/{len(fuzzy_idx)} unique descriptions")
+
+            columns = {
+                "Category": categories,
+                "Match_Score": match_scores,
+                "Matched_Rule": matched_rules,
+                "Auto_Approved": auto_approved,
+            }
+            columns.update({f"Suggestion_{i+1}": col for i, col in enumerate(suggestion_cols)})
+            match_df = pd.DataFrame(columns, index=pd.Index(unique_cleans))
+            matched = match_df.reindex(desc_cleans.to_numpy())
+            matched.index = bank_df.index
 
             bank_df = bank_df.copy()
-            bank_df["Category"] = categories
-            bank_df["Match_Score"] = match_scores
-            bank_df["Matched_Rule"] = matched_rules
-            bank_df["Auto_Approved"] = auto_approved
-
-            for i in range(self.config.num_suggestions):
-                bank_df[f"Suggestion_{i+1}"] = suggestion_cols[i]
+            for col in match_df.columns:
+                bank_df[col] = matched[col]
 
+            self.logger.info(f"Processed {len(bank_df)} transactions ({len(unique_cleans)} unique descriptions)")
             elapsed_time = time.time() - start_time
             self.logger.info(f"Categorization completed in {elapsed_time:.2f} seconds")
             return bank_df
@@ -1,16 +1,24 @@
-import pandas as pd
+import csv
 import sqlite3
 
 def import_csv_to_db(csv_path: str, db_name: str):
     db_path = f"{db_name}.db"
-    df = pd.read_csv(csv_path)
-    df = df.dropna(subset=["Description", "Category"])
-    df = df[["Description", "Category"]]
-
-    with sqlite3.connect(db_path) as conn:
-        conn.execute("DROP TABLE IF EXISTS rules")
-        df.to_sql("rules", conn, index=False)
-        print(f"✅ Imported {len(df)} rules into {db_path} [rules]")
+    with sqlite3.connect(db_path) as conn, open(csv_path, newline="", encoding="utf-8-sig") as f:
+        # The table is rebuilt from the CSV on every run, so a crash only means re-running it
+        conn.executescript(
+            "PRAGMA synchronous=OFF; PRAGMA journal_mode=MEMORY;"
+            "DROP TABLE IF EXISTS rules;"
+            "CREATE TABLE rules (description TEXT, category TEXT);"
+        )
+        rows = (
+            (row["Description"], row["Category"])
+            for row in csv.DictReader(f)
+            if row.get("Description") and row.get("Category")
+        )
+        conn.execute("BEGIN")
+        cur = conn.executemany("INSERT INTO rules (description, category) VALUES (?, ?)", rows)
+        conn.commit()
+        print(f"✅ Imported {cur.rowcount} rules into {db_path} [rules]")
 
 # Usage
 if __name__ == "__main__":
@@ -1,6 +1,6 @@
 import os
 import pandas as pd
-from fuzzy_logic_improved import enhanced_clean_description
+from fuzzy_logic_improved import clean_description_series
 from pathlib import Path
 
 # === Configuration ===
@@ -11,7 +11,7 @@ CORRECTION_PREFIX = "manual_corrections_"
 # === Load existing rules ===
 print(f"Loading main rules from: {RULES_PATH}")
 rules_df = pd.read_csv(RULES_PATH)
-rules_df["Description_Clean"] = rules_df["Description"].apply(enhanced_clean_description)
+rules_df["Description_Clean"] = clean_description_series(rules_df["Description"])
 
 existing_rules = dict(zip(rules_df["Description_Clean"], rules_df["Category"]))
 
@@ -32,7 +32,7 @@ for file in correction_files:
     try:
         df = pd.read_csv(path)
         df = df.dropna(subset=["Description", "Category"])
-        df["Description_Clean"] = df["Description"].apply(enhanced_clean_description)
+        df["Description_Clean"] = clean_description_series(df["Description"])
 
         for _, row in df.iterrows():
             clean_desc = row["Description_Clean"]
@@ -1,17 +1,23 @@
 # === IMPORTS ===
-from logging import config
 import pandas as pd  # Data manipulation library
 from rapidfuzz import process, fuzz  # Fast fuzzy string matching
+from rapidfuzz.distance import Indel  # Bit-parallel edit distance for the token-set prefilter
+import numpy as np  # Score matrices for batch matching
 import re  # Regular expressions for text cleaning
+import math  # Rounding score cutoffs to distance bounds
+from collections import defaultdict  # Token postings for the fuzzy prefilter
 import sys  # Used for exiting with success/failure status
 import logging  # Logging infrastructure
-from functools import lru_cache  # For memoization of match function
 from dataclasses import dataclass  # For clean configuration structure
 from logic.paths import DATA_DIR
-from typing import Tuple, List, Dict, Optional  # Type annotations
+try:
+    import pyarrow as pa  # C++ CSV writer, installed alongside streamlit
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+from typing import Tuple, List, Dict, Optional, Iterator  # Type annotations
 import time  # Measuring execution time
 from pathlib import Path  # Path utilities for file existence checking
-import sqlite3  # For loading rules from a database
 
 # === CONFIGURATION ===
 @dataclass
@@ -23,8 +29,9 @@ class Config:
     match_threshold: int = 90  # Minimum score to consider a match valid
     num_suggestions: int = 3  # Number of suggestions to generate
     auto_approve_threshold: int = 95  # Score to auto-approve a match
-    chunk_size: int = 1000  # Unused, potentially for batch processing
-    cache_size: int = 1000  # Unused, default cache size (for lru_cache)
+    chunk_size: int = 1000  # Statement rows read, categorised and written at a time
+    workers: int = -1  # Threads used by rapidfuzz's cdist (-1 = all cores)
+    cache_size: int = 16384  # Max entries held by the per-instance suggestion cache
     directional_file: str = str(DATA_DIR / "directional_merchants.csv")
     use_tax_rules: bool = False        # whether to apply “Refund:” logic
     refund_edge_cases_file: str = str(DATA_DIR / "refund_edge_cases.csv")
@@ -52,29 +59,179 @@ def setup_logging():
     return logger
 
 # === ENHANCED CLEANING FUNCTIONS ===
+# Compiled once at import; the cleaners run for every transaction and rule.
+# Financial noise words, long digit runs and non-alphanumerics are removed in
+# a single scan; word boundaries are judged on the original text, which gives
+# the same result as removing them one after another. ASCII-only, so \b and
+# \d mean the same to Python's re and to Arrow's regex engine.
+_RE_CLEAN = re.compile(r'\b(?:ref|payment|purchase|transaction|debit|credit|\d{4,})\b|[^a-z0-9 ]', re.ASCII)
+_RE_NONALNUM = re.compile(r'[^a-z0-9 ]')
+_RE_SPACES = re.compile(r' {2,}')
+
 def enhanced_clean_description(text: str) -> str:
     """Enhanced cleaning with financial-specific preprocessing"""
     if not isinstance(text, str) or not text.strip():
         return ""
-    text = text.lower().strip()
-    text = re.sub(r'\b(ref|payment|purchase|transaction|debit|credit)\b', '', text)
-    text = re.sub(r'\b\d{4,}\b', '', text)
-    text = re.sub(r'[^a-z0-9 ]', '', text)
-    text = re.sub(r'\s+', ' ', text)
-    return text.strip()
+    return " ".join(_RE_CLEAN.sub('', text.lower()).split())
+
+def clean_description_series(texts: pd.Series) -> pd.Series:
+    """Column-wise enhanced_clean_description using pandas string methods"""
+    if not pd.api.types.is_string_dtype(texts):
+        # Numbers and other non-strings clean to "" as in the scalar version
+        texts = texts.astype(object).where(texts.map(lambda v: isinstance(v, str)))
+    clean_re, spaces_re = _RE_CLEAN, _RE_SPACES
+    if getattr(texts.dtype, "storage", None) == "pyarrow":
+        # Arrow-backed strings only run the replace in Arrow's kernel when
+        # given the pattern text; compiled patterns fall back to Python
+        clean_re, spaces_re = _RE_CLEAN.pattern, _RE_SPACES.pattern
+    cleaned = (
+        texts.str.lower()
+        .str.replace(clean_re, "", regex=True)
+        .str.replace(spaces_re, " ", regex=True)
+        .str.strip()
+    )
+    return cleaned.fillna("")
+
+def to_arrow_strings(texts: pd.Series) -> pd.Series:
+    """
+    Text columns as contiguous Arrow-backed strings, which use far less memory
+    than object columns and clean faster. Other columns are returned as-is.
+    """
+    if pa is None or texts.dtype != object:
+        return texts
+    return texts.astype("string[pyarrow]")
 
 def basic_clean_description(text: str) -> str:
     """Basic cleaning function (fallback)"""
     if not isinstance(text, str):
         return ""
     text = text.lower()
-    text = re.sub(r"[^a-z0-9 ]", "", text)
-    text = re.sub(r"\s+", " ", text)
-    return text.strip()
+    return " ".join(_RE_NONALNUM.sub("", text).split())
 
 # === HYBRID SCORER ===
-def hybrid_score(a: str, b: str, **kwargs) -> float:
-    return 0.6 * fuzz.token_set_ratio(a, b) + 0.4 * fuzz.partial_ratio(a, b)
+TOKEN_SET_WEIGHT = 0.6
+PARTIAL_WEIGHT = 0.4
+
+MATCH_BLOCK_CELLS = 1 << 21  # Query x rule scores computed per block (16 MB as float64)
+SUGGESTION_CUTOFF = 50  # Minimum hybrid score for a rule to be offered as a suggestion
+TAX_PREFIXES = ("", "Expense: ", "Refund: ", "Income: ")  # Indexed by the tax-mode prefix code
+
+def _sorted_tokens(text: str) -> str:
+    return " ".join(sorted(set(text.split())))
+
+@dataclass
+class ChoiceIndex:
+    """Choice-side inputs of _token_set_matrix, built once per rule set."""
+    tokens: List[str]  # Sorted, de-duplicated tokens of each choice
+    lengths: np.ndarray
+    empty: np.ndarray  # Choices without any token
+    postings: Dict[str, List[int]]  # Token -> indices of the choices containing it
+
+def build_choice_index(choices: List[str]) -> ChoiceIndex:
+    tokens = [_sorted_tokens(c) for c in choices]
+    postings = defaultdict(list)
+    for j, choice in enumerate(choices):
+        for token in set(choice.split()):
+            postings[token].append(j)
+    return ChoiceIndex(
+        tokens=tokens,
+        lengths=np.array([len(t) for t in tokens], dtype=np.int64),
+        empty=np.array([not t for t in tokens], dtype=bool),
+        postings=dict(postings),
+    )
+
+def _token_set_matrix(
+    queries: List[str], choices: List[str], score_cutoff: float, workers: int = -1,
+    index: Optional[ChoiceIndex] = None,
+) -> np.ndarray:
+    """
+    token_set_ratio for every (query, choice) pair. When two strings share no
+    token, token_set_ratio is plain Indel similarity (fuzz.ratio) of their
+    sorted, de-duplicated tokens. The whole matrix is therefore filled from
+    rapidfuzz's bit-parallel Indel kernel, and token_set_ratio itself only
+    runs for the pairs that share at least one token.
+    """
+    if index is None:
+        index = build_choice_index(choices)
+    # Same arithmetic as token_set_ratio uses for disjoint token sets, so the
+    # scores (and ties between rules) match it exactly
+    query_tokens = [_sorted_tokens(q) for q in queries]
+    lensum = np.add.outer(np.array([len(t) for t in query_tokens], dtype=np.int64), index.lengths)
+    # The Indel distance is at least the length difference, so with a distance
+    # cutoff rapidfuzz can skip pairs whose lengths are too far apart to pass
+    max_dist = math.ceil((1 - score_cutoff / 100) * lensum.max()) if lensum.size else None
+    dist = process.cdist(
+        query_tokens, index.tokens, scorer=Indel.distance, dtype=np.int32, workers=workers, score_cutoff=max_dist
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = 100 - 100 * dist / lensum
+    scores[scores < score_cutoff] = 0.0
+    # token_set_ratio scores strings without tokens 0
+    scores[[not t for t in query_tokens]] = 0.0
+    scores[:, index.empty] = 0.0
+
+    for i, query in enumerate(queries):
+        shared = list({j for token in set(query.split()) for j in index.postings.get(token, ())})
+        if shared:
+            scores[i, shared] = process.cdist(
+                [query], [choices[j] for j in shared], scorer=fuzz.token_set_ratio,
+                dtype=np.float64, score_cutoff=score_cutoff,
+            )[0]
+    return scores
+
+def hybrid_score_matrix(
+    queries: List[str], choices: List[str], score_cutoff: float = 0.0, workers: int = -1,
+    index: Optional[ChoiceIndex] = None,
+) -> np.ndarray:
+    """
+    Weighted blend of token_set_ratio and partial_ratio for every (query,
+    choice) pair. token_set_ratio is computed for the whole matrix with native
+    process.cdist calls; partial_ratio is then only computed for pairs whose
+    token-set score can still reach score_cutoff. Pairs that cannot reach it
+    are left at a lower score. Pass a prebuilt index (build_choice_index)
+    when the same choices are scored repeatedly.
+    """
+    # cdist converts cutoffs to edit-distance bounds less precisely than the
+    # scalar scorers, so leave some slack to never drop a qualifying pair
+    token_set = _token_set_matrix(
+        queries, choices,
+        score_cutoff=max(0.0, (score_cutoff - 100 * PARTIAL_WEIGHT) / TOKEN_SET_WEIGHT - 1e-3),
+        workers=workers, index=index,
+    )
+    if score_cutoff <= 100 * PARTIAL_WEIGHT:
+        partial = process.cdist(queries, choices, scorer=fuzz.partial_ratio, dtype=np.float64, workers=workers)
+        return TOKEN_SET_WEIGHT * token_set + PARTIAL_WEIGHT * partial
+
+    scores = TOKEN_SET_WEIGHT * token_set
+    for i, j in zip(*np.nonzero(token_set)):
+        # partial_ratio only has to make up what the token-set share leaves
+        # short of the cutoff, so rapidfuzz can give up on hopeless pairs early
+        needed = (score_cutoff - scores[i, j]) / PARTIAL_WEIGHT - 1e-9
+        if needed <= 100:
+            scores[i, j] += PARTIAL_WEIGHT * fuzz.partial_ratio(queries[i], choices[j], score_cutoff=max(0.0, needed))
+    return scores
+
+def _first_non_null(arr: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Left-most non-NaN value of each row of a 2-D float array (NaN if the row
+    has none) and the column it came from.
+    """
+    if arr.shape[1] == 0:
+        return np.full(arr.shape[0], np.nan), np.zeros(arr.shape[0], dtype=np.intp)
+    col = (~np.isnan(arr)).argmax(axis=1)
+    return arr[np.arange(arr.shape[0]), col], col
+
+def _to_float_matrix(frame: pd.DataFrame) -> np.ndarray:
+    """
+    Columns of `frame` as a 2-D float array; text that is not a number
+    becomes NaN, so it counts as a missing value.
+    """
+    if frame.shape[1] == 0:
+        return np.empty((len(frame), 0))
+    return np.column_stack([
+        pd.to_numeric(frame.iloc[:, i], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+        for i in range(frame.shape[1])
+    ])
 
 # === MAIN CATEGORIZER CLASS ===
 class TransactionCategorizer:
@@ -83,24 +240,38 @@ class TransactionCategorizer:
         self.logger = setup_logging()
         self.rule_map: Dict[str, str] = {}
         self.rule_keys: List[str] = []
-        self._match_cache = {}
-
+        # Parallel arrays of rule keys and categories, indexed by score-matrix column
+        self.rule_keys_arr = np.empty(0, dtype=object)
+        self.rule_cats_arr = np.empty(0, dtype=object)
+        # Token-level preprocessing of rule_keys, shared by every scoring call
+        self._rule_index = build_choice_index([])
+        # Best match per cleaned description, prewarmed with the exact rule hits
+        # by load_rules and released together with the categorizer
+        self._match_cache: Dict[str, Tuple[str, float, str]] = {}
+        # Ranked suggestions per (cleaned description, count), shared by the
+        # single and batch paths so repeats across chunks are scored once
+        self._suggestion_cache: Dict[Tuple[str, int], Tuple[Tuple[str, ...], Tuple[float, ...]]] = {}
+        # generate_report output of the latest successful run
+        self.last_report: Optional[Dict] = None
+
+        # Fixed lookup tables of cleaned (lower-case) merchant names, matched
+        # against the already-cleaned Matched_Rule values
         try:
             dm = pd.read_csv(self.config.directional_file)
             dm = dm.dropna(subset=["description_clean"])
-            self.directional = set(dm["description_clean"].astype(str))
+            self.directional = frozenset(dm["description_clean"].astype(str).str.strip().str.lower())
             self.logger.info(f"Loaded {len(self.directional)} directional merchants")
         except Exception as e:
-            self.directional = set()
+            self.directional = frozenset()
             self.logger.warning(f"Could not load directional merchants: {e}")
 
         try:
             ec = pd.read_csv(self.config.refund_edge_cases_file)
             ec = ec.dropna(subset=["description_clean"])
-            self.refund_edge_cases = set(ec["description_clean"].astype(str))
+            self.refund_edge_cases = frozenset(ec["description_clean"].astype(str).str.strip().str.lower())
             self.logger.info(f"Loaded {len(self.refund_edge_cases)} refund edge-cases")
         except Exception as e:
-            self.refund_edge_cases = set()
+            self.refund_edge_cases = frozenset()
             self.logger.warning(f"Could not load refund edge-cases: {e}")
 
     def load_rules(self, rules_file: str = None, db_conn=None, table_name: str = "rules") -> bool:
@@ -109,27 +280,36 @@ class TransactionCategorizer:
                 self.logger.info("Loading rules from database...")
                 if table_name != "rules":
                     raise ValueError("Invalid table name. Only 'rules' table is supported.")
-                rules_df = pd.read_sql("SELECT description, category FROM rules", db_conn)
+                # rowid order keeps rule order (and suggestion ties) stable whatever indexes exist
+                rules_df = pd.read_sql("SELECT description, category FROM rules ORDER BY rowid", db_conn)
             elif rules_file:
                 self.logger.info(f"Loading rules from CSV file: {rules_file}")
                 if not Path(rules_file).exists():
                     raise FileNotFoundError(f"Rules file not found: {rules_file}")
-                rules_df = pd.read_csv(rules_file)
+                # Rules are plain text, so skip per-column type inference
+                rules_df = pd.read_csv(rules_file, dtype="string", engine="pyarrow")
             else:
                 raise ValueError("Must provide either rules_file or db_conn")
 
-            rules_df.columns = rules_df.columns.str.lower().str.strip()
+            rules_df.columns = [str(col).lower().strip() for col in rules_df.columns]
             required_cols = ["description", "category"]
             missing_cols = [col for col in required_cols if col not in rules_df.columns]
             if missing_cols:
                 raise ValueError(f"Missing columns: {missing_cols}")
 
             rules_df = rules_df.dropna(subset=["description", "category"])
-            rules_df["description_clean"] = rules_df["description"].apply(enhanced_clean_description)
+            rules_df["description_clean"] = clean_description_series(rules_df["description"])
             rules_df = rules_df[rules_df["description_clean"] != ""]
 
-            self.rule_map = rules_df.set_index("description_clean")["category"].to_dict()
+            rule_map = rules_df.set_index("description_clean")["category"].to_dict()
+            # Interned keys let matched descriptions share the rule's string object
+            self.rule_map = {sys.intern(key): category for key, category in rule_map.items()}
             self.rule_keys = list(self.rule_map.keys())
+            self.rule_keys_arr = np.array(self.rule_keys, dtype=object)
+            self.rule_cats_arr = np.array(list(self.rule_map.values()), dtype=object)
+            self._rule_index = build_choice_index(self.rule_keys)
+            self._match_cache = {key: (category, 100.0, key) for key, category in self.rule_map.items()}
+            self._suggestion_cache.clear()
             self.logger.info(f"Loaded {len(self.rule_keys)} categorisation rules.")
             return True
 
@@ -143,11 +323,16 @@ class TransactionCategorizer:
             if not Path(bank_file).exists():
                 raise FileNotFoundError(f"Bank statement file not found: {bank_file}")
 
-            bank_df = pd.read_csv(bank_file)
+            try:
+                bank_df = pd.read_csv(bank_file, engine="pyarrow")
+            except pd.errors.ParserError:
+                # Arrow's reader rejects quoted cells spanning several lines
+                bank_df = pd.read_csv(bank_file)
             if "Description" not in bank_df.columns:
                 raise ValueError("Missing 'Description' column in bank statement file")
 
-            bank_df["Description_Clean"] = bank_df["Description"].apply(enhanced_clean_description)
+            bank_df["Description"] = to_arrow_strings(bank_df["Description"])
+            bank_df["Description_Clean"] = clean_description_series(bank_df["Description"])
             self.logger.info(f"Successfully loaded {len(bank_df)} transactions")
             return bank_df
 
@@ -155,27 +340,42 @@ class TransactionCategorizer:
             self.logger.error(f"Error loading bank statement: {e}")
             return None
 
-    @lru_cache(maxsize=1000)
-    def _cached_match(self, desc_clean: str) -> Tuple[str, float, str]:
-        return self._get_best_match_internal(desc_clean)
+    def load_bank_statement_chunks(self, bank_file: str) -> Optional[Iterator[pd.DataFrame]]:
+        """
+        Same as load_bank_statement, but yields the statement chunk_size rows
+        at a time so large files are never held in memory whole.
+        """
+        try:
+            self.logger.info(f"Loading bank statement from {bank_file} in chunks of {self.config.chunk_size}")
+            if not Path(bank_file).exists():
+                raise FileNotFoundError(f"Bank statement file not found: {bank_file}")
+            # Arrow's reader cannot stream chunks; round_trip keeps its exact float parsing
+            reader = pd.read_csv(bank_file, chunksize=self.config.chunk_size, float_precision="round_trip")
+        except Exception as e:
+            self.logger.error(f"Error loading bank statement: {e}")
+            return None
+
+        def chunks() -> Iterator[pd.DataFrame]:
+            with reader:
+                for chunk in reader:
+                    if "Description" not in chunk.columns:
+                        raise ValueError("Missing 'Description' column in bank statement file")
+                    chunk["Description"] = to_arrow_strings(chunk["Description"])
+                    chunk["Description_Clean"] = clean_description_series(chunk["Description"])
+                    yield chunk
+
+        return chunks()
+
+    def _block_size(self) -> int:
+        """Query rows per scoring block, sized so the block's score matrix stays within MATCH_BLOCK_CELLS"""
+        return max(1, MATCH_BLOCK_CELLS // max(1, len(self.rule_keys)))
 
     def _get_best_match_internal(self, desc_clean: str) -> Tuple[str, float, str]:
         if not desc_clean or not self.rule_keys:
             return ("Uncategorised", 0.0, "")
 
-        if desc_clean in self.rule_map:
-            return (self.rule_map[desc_clean], 100.0, desc_clean)
-
         try:
-            result = process.extractOne(desc_clean, self.rule_keys, scorer=hybrid_score)
-            if result is None:
-                return ("Uncategorised", 0.0, "")
-
-            best_match, score, _ = result
-            if score >= self.config.match_threshold:
-                return (self.rule_map[best_match], score, best_match)
-            else:
-                return ("Uncategorised", score, best_match)
+            return self.match_descriptions([desc_clean])[0]
 
         except Exception as e:
             self.logger.warning(f"Error in fuzzy matching for '{desc_clean}': {e}")
@@ -183,7 +383,89 @@ class TransactionCategorizer:
 
     def get_best_match(self, desc: str) -> Tuple[str, float, str]:
         desc_clean = enhanced_clean_description(desc)
-        return self._cached_match(desc_clean)
+        result = self._match_cache.get(desc_clean)
+        if result is None:
+            result = self._match_cache[desc_clean] = self._get_best_match_internal(desc_clean)
+        return result
+
+    def match_descriptions(self, desc_cleans: List[str]) -> List[Tuple[str, float, str]]:
+        """
+        Batch version of get_best_match for already-cleaned descriptions.
+        Each distinct description is matched once: exact hits and earlier
+        results come from the match cache, the rest are scored together with
+        hybrid_score_matrix, one block of rows at a time, and the results are
+        cached and mapped back to every row.
+        """
+        no_match = ("Uncategorised", 0.0, "")
+        if not self.rule_keys:
+            return [no_match] * len(desc_cleans)
+
+        # Exact rule hits and earlier results come straight from the cache
+        found = self._match_cache
+        pending = [desc_clean for desc_clean in dict.fromkeys(desc_cleans) if desc_clean and desc_clean not in found]
+
+        threshold = self.config.match_threshold
+        block_size = self._block_size()
+        for start in range(0, len(pending), block_size):
+            block = pending[start:start + block_size]
+            scores = hybrid_score_matrix(
+                block, self.rule_keys, score_cutoff=threshold, workers=self.config.workers, index=self._rule_index
+            )
+            best_idx = scores.argmax(axis=1)
+            best_scores = np.take_along_axis(scores, best_idx[:, None], axis=1)[:, 0]
+            found.update(dict.fromkeys(block, no_match))
+            # Only rows that cleared the threshold are gathered
+            hits = np.flatnonzero(best_scores >= threshold)
+            for k, category, best_match in zip(
+                hits, self.rule_cats_arr[best_idx[hits]], self.rule_keys_arr[best_idx[hits]]
+            ):
+                found[block[k]] = (category, float(best_scores[k]), best_match)
+
+        return [found.get(desc_clean, no_match) for desc_clean in desc_cleans]
+
+    def _rank_suggestions(self, scores: np.ndarray, num: int) -> Tuple[Tuple[str, ...], Tuple[float, ...]]:
+        """
+        Categories of the `num` best-scoring rules, ties kept in rule order as
+        process.extract did, padded with "No Match". Tuples, so memoized
+        results cannot be mutated by callers.
+        """
+        candidates = np.arange(len(scores))
+        if 0 < num < len(scores):
+            # Only the num best scores (and anything tied with the last) need sorting
+            kth = np.partition(scores, -num)[-num]
+            candidates = np.flatnonzero(scores >= kth)
+        top = candidates[np.argsort(-scores[candidates], kind="stable")][:num]
+        top = top[scores[top] >= SUGGESTION_CUTOFF]
+        suggestions = self.rule_cats_arr[top].tolist()
+        confidences = [round(float(scores[j]), 2) for j in top]
+
+        while len(suggestions) < num:
+            suggestions.append("No Match")
+            confidences.append(0.0)
+
+        return tuple(suggestions), tuple(confidences)
+
+    def _get_top_suggestions_internal(self, desc_clean: str, num: int) -> Tuple[Tuple[str, ...], Tuple[float, ...]]:
+        scores = hybrid_score_matrix(
+            [desc_clean], self.rule_keys, score_cutoff=SUGGESTION_CUTOFF, workers=self.config.workers,
+            index=self._rule_index,
+        )[0]
+        return self._rank_suggestions(scores, num)
+
+    def _cached_suggestions(self, desc_clean: str, num: int) -> Tuple[Tuple[str, ...], Tuple[float, ...]]:
+        result = self._suggestion_cache.get((desc_clean, num))
+        if result is None:
+            result = self._get_top_suggestions_internal(desc_clean, num)
+            self._remember_suggestions(desc_clean, num, result)
+        return result
+
+    def _remember_suggestions(self, desc_clean: str, num: int, result: Tuple[Tuple[str, ...], Tuple[float, ...]]):
+        if self.config.cache_size <= 0:
+            return
+        if len(self._suggestion_cache) >= self.config.cache_size:
+            # Full: drop the oldest entry
+            del self._suggestion_cache[next(iter(self._suggestion_cache))]
+        self._suggestion_cache[(desc_clean, num)] = result
 
     def get_top_suggestions(self, desc: str, num: int = None) -> Tuple[List[str], List[float]]:
         if num is None:
@@ -194,121 +476,170 @@ class TransactionCategorizer:
             return (["No Match"] * num, [0.0] * num)
 
         try:
-            matches = process.extract(desc_clean, self.rule_keys, scorer=hybrid_score, score_cutoff=50, limit=num)
-            suggestions = [self.rule_map[match[0]] for match in matches]
-            confidences = [round(match[1], 2) for match in matches]
-
-            while len(suggestions) < num:
-                suggestions.append("No Match")
-                confidences.append(0.0)
-
-            return suggestions, confidences
+            suggestions, confidences = self._cached_suggestions(desc_clean, num)
+            return list(suggestions), list(confidences)
 
         except Exception as e:
             self.logger.warning(f"Error getting suggestions for '{desc}': {e}")
             return (["No Match"] * num, [0.0] * num)
 
+    def suggest_descriptions(self, desc_cleans: List[str], num: int = None) -> List[Tuple[Tuple[str, ...], Tuple[float, ...]]]:
+        """
+        Batch version of get_top_suggestions for already-cleaned descriptions.
+        Distinct descriptions are scored together with hybrid_score_matrix, one
+        block of rows at a time.
+        """
+        if num is None:
+            num = self.config.num_suggestions
+        no_match = (("No Match",) * num, (0.0,) * num)
+        if not self.rule_keys:
+            return [no_match] * len(desc_cleans)
+
+        found = {}
+        pending = []
+        for desc_clean in dict.fromkeys(desc_cleans):
+            if not desc_clean:
+                continue
+            cached = self._suggestion_cache.get((desc_clean, num))
+            if cached is not None:
+                found[desc_clean] = cached
+            else:
+                pending.append(desc_clean)
+        block_size = self._block_size()
+        for start in range(0, len(pending), block_size):
+            block = pending[start:start + block_size]
+            try:
+                scores = hybrid_score_matrix(
+                    block, self.rule_keys, score_cutoff=SUGGESTION_CUTOFF, workers=self.config.workers,
+                    index=self._rule_index,
+                )
+            except Exception as e:
+                self.logger.warning(f"Error getting suggestions for {len(block)} descriptions: {e}")
+                continue
+            for desc_clean, row in zip(block, scores):
+                found[desc_clean] = self._rank_suggestions(row, num)
+                self._remember_suggestions(desc_clean, num, found[desc_clean])
+
+        return [found.get(desc_clean, no_match) for desc_clean in desc_cleans]
+
     def should_auto_approve(self, category: str, score: float) -> bool:
         return (score >= self.config.auto_approve_threshold and category != "Uncategorised")
 
-    POSITIVE_COLS = {"credit", "paid in", "money in", "inflow"}
-    NEGATIVE_COLS = {"debit",  "paid out","money out","outflow"}
+    POSITIVE_COLS = frozenset({"credit", "paid in", "money in", "inflow"})
+    NEGATIVE_COLS = frozenset({"debit",  "paid out","money out","outflow"})
 
-    def _get_signed_value(self, row: pd.Series) -> float:
+    def _classify_value_columns(self, columns) -> Tuple[List[Tuple[int, float]], List[int]]:
         """
-        Look through all columns in `row`, match case-insensitively
-        against POSITIVE_COLS / NEGATIVE_COLS, and return a signed float.
+        Positions of the signed columns as (position, sign) pairs and of the
+        'amount' columns, both in column order. Names are matched
+        case-insensitively against POSITIVE_COLS / NEGATIVE_COLS.
         """
-        for col, val in row.items():
-            if pd.isnull(val):
-                continue
-            key = col.lower().strip()
+        signed_cols, amount_cols = [], []
+        for i, col in enumerate(columns):
+            key = str(col).lower().strip()
             if key in self.POSITIVE_COLS:
-                return abs(float(val))
-            if key in self.NEGATIVE_COLS:
-                return -abs(float(val))
-
-        # fallback: any column named 'amount' (case-insensitive)
-        for col, val in row.items():
-            if pd.isnull(val):
-                continue
-            if col.lower().strip() == "amount":
-                return float(val)
-
-        return 0.0
+                signed_cols.append((i, 1.0))
+            elif key in self.NEGATIVE_COLS:
+                signed_cols.append((i, -1.0))
+            elif key == "amount":
+                amount_cols.append(i)
+        return signed_cols, amount_cols
+
+    def _get_signed_values(self, bank_df: pd.DataFrame) -> np.ndarray:
+        """
+        Signed value of every row: the first non-null signed column (left to
+        right), made positive or negative; otherwise the first non-null
+        'amount' column; otherwise 0.0.
+        """
+        signed_cols, amount_cols = self._classify_value_columns(bank_df.columns)
+        signs = np.array([sign for _, sign in signed_cols])
+        signed = _to_float_matrix(bank_df.iloc[:, [i for i, _ in signed_cols]])
+        values, col = _first_non_null(signed)
+        values = signs[col] * np.abs(values) if len(signs) else values
+
+        # fallback: any column named 'amount' (case-insensitive), only read
+        # when some row has no signed value
+        missing = np.isnan(values)
+        if amount_cols and missing.any():
+            amount, _ = _first_non_null(_to_float_matrix(bank_df.iloc[:, amount_cols]))
+            values = np.where(missing, amount, values)
+        return np.nan_to_num(values, nan=0.0)
 
     def categorize_transactions(self, bank_df: pd.DataFrame) -> pd.DataFrame:
         self.logger.info("Starting transaction categorization...")
         start_time = time.time()
 
-        categories      = []
-        match_scores    = []
-        matched_rules   = []
-        auto_approved   = []
-        suggestion_cols = [[] for _ in range(self.config.num_suggestions)]
-        values_list     = []
-
         total = len(bank_df)
-        processed = 0
 
         try:
-            for _, row in bank_df.iterrows():
-                # 1) Read and clean description
-                desc       = row["Description"]
-                desc_clean = enhanced_clean_description(desc)
-
-                # 2) Compute signed value
-                value = self._get_signed_value(row)
-
-                # 3) Fuzzy-match
-                base_cat, score, matched_rule = self.get_best_match(desc)
-
-                # 4) Prefix logic – only in tax‐mode with a built-in directional merchant
-                if self.config.use_tax_rules and matched_rule in self.directional:
-                    if value < 0:
-                        # always prefix debits as Expense in tax mode
-                        category = f"Expense: {base_cat}"
-                    elif matched_rule not in self.refund_edge_cases:
-                        # in tax mode, credits → Refund (unless edge‐case)
-                        category = f"Refund: {base_cat}"
-                    else:
-                        # credits but this is an edge‐case merchant
-                        category = f"Income: {base_cat}"
-                else:
-                    # accounting mode or custom rules or non‐directional merchants: no prefix
-                    category = base_cat
-
-                # 5) Collect results
-                categories.append(category)
-                match_scores.append(round(score, 2))
-                matched_rules.append(matched_rule)
-                auto_approved.append(self.should_auto_approve(base_cat, score))
-                values_list.append(value)
-
-                # 6) Suggestions (unchanged)
-                if base_cat == "Uncategorised":
-                    suggestions, confidences = self.get_top_suggestions(desc)
-                    for i, (sugg, conf) in enumerate(zip(suggestions, confidences)):
-                        suggestion_cols[i].append(f"{sugg} ({conf}%)")
-                else:
-                    for i in range(self.config.num_suggestions):
-                        suggestion_cols[i].append("")
-
-                processed += 1
-                if processed % 100 == 0:
-                    self.logger.info(f"Processed {processed}/{total} transactions")
-
-            # 7) Assemble output
-            out = bank_df.copy()
-            out["Category"]      = categories
-            out["Match_Score"]   = match_scores
-            out["Matched_Rule"]  = matched_rules
-            out["Values"]        = values_list
-            out["Auto_Approved"] = auto_approved
+            # 1-3) Descriptions, signed values and fuzzy matches are read column-wise
+            # load_bank_statement has already cleaned the descriptions
+            if "Description_Clean" in bank_df.columns:
+                desc_cleans = bank_df["Description_Clean"].fillna("")
+            else:
+                desc_cleans = clean_description_series(bank_df["Description"])
+            # Everything that depends only on the description is worked out
+            # once per distinct description and gathered to rows by code
+            codes, uniques = pd.factorize(desc_cleans)
+            uniques = list(uniques)
+            matches = self.match_descriptions(uniques)
+            values = self._get_signed_values(bank_df)
+
+            u_cats   = np.array([m[0] for m in matches], dtype=object)
+            u_scores = np.array([m[1] for m in matches], dtype=float)
+            u_rules  = np.array([m[2] for m in matches], dtype=object)
+            u_rounded = np.array([round(score, 2) for score in u_scores.tolist()], dtype=float)
+
+            base_cats     = u_cats[codes]
+            raw_scores    = u_scores[codes]
+            matched_rules = u_rules[codes]
+            match_scores  = u_rounded[codes]
+            auto_approved = (raw_scores >= self.config.auto_approve_threshold) & (base_cats != "Uncategorised")
+
+            # 4) Prefix logic – only in tax‐mode with a built-in directional merchant.
+            # Debits are always Expense; credits are Refund unless the merchant
+            # is an edge-case, which makes them Income. Accounting mode, custom
+            # rules and non-directional merchants keep the base category.
+            categories = base_cats
+            if self.config.use_tax_rules:
+                u_matched = pd.Series(u_rules, dtype=object)
+                is_dir = u_matched.isin(self.directional).to_numpy()[codes]
+                is_edge = u_matched.isin(self.refund_edge_cases).to_numpy()[codes]
+                prefix_codes = np.select(
+                    [is_dir & (values < 0), is_dir & ~is_edge, is_dir], [1, 2, 3], default=0
+                )
+                # Each (prefix, description) pair is formatted once
+                n_unique = max(len(uniques), 1)
+                label_codes, label_keys = pd.factorize(prefix_codes * n_unique + codes)
+                labels = np.empty(len(label_keys), dtype=object)
+                labels[:] = [
+                    f"{TAX_PREFIXES[key // n_unique]}{u_cats[key % n_unique]}" if key >= n_unique
+                    else u_cats[key]
+                    for key in label_keys.tolist()
+                ]
+                categories = labels[label_codes]
+
+            # 5) Suggestions are only shown for uncategorised descriptions
+            u_unmatched = np.flatnonzero(u_cats == "Uncategorised")
+            suggestions = self.suggest_descriptions([uniques[k] for k in u_unmatched])
+            suggestion_cols = []
             for i in range(self.config.num_suggestions):
-                out[f"Suggestion_{i+1}"] = suggestion_cols[i]
+                u_col = np.full(len(uniques), "", dtype=object)
+                u_col[u_unmatched] = [f"{sugg[i]} ({conf[i]}%)" for sugg, conf in suggestions]
+                suggestion_cols.append(u_col[codes])
+
+            # 6) Assemble output
+            out = bank_df.assign(
+                Category=categories,
+                Match_Score=match_scores,
+                Matched_Rule=matched_rules,
+                Values=values,
+                Auto_Approved=auto_approved,
+                **{f"Suggestion_{i+1}": col for i, col in enumerate(suggestion_cols)},
+            )
 
             elapsed = time.time() - start_time
+            self.logger.info(f"Processed {total} transactions")
             self.logger.info(f"Categorization completed in {elapsed:.2f} seconds")
             return out
 
@@ -337,10 +668,32 @@ class TransactionCategorizer:
 
         return report
 
-    def save_results(self, results_df: pd.DataFrame, output_file: str) -> bool:
+    def save_results(self, results_df: pd.DataFrame, output_file: str, append: bool = False) -> bool:
+        """Write results_df to output_file, or add its rows (without a header) when append is set."""
+        # pandas writes chunk_size rows per batch, with the same '\n' line
+        # endings as Arrow so appended chunks agree on every platform
+        pandas_options = dict(
+            index=False, mode="a" if append else "w", header=not append,
+            lineterminator="\n", chunksize=self.config.chunk_size,
+        )
         try:
-            results_df.to_csv(output_file, index=False)
-            self.logger.info(f"[SUCCESS] Results saved to {output_file}")
+            # The writer depends only on whether pyarrow is installed, so every
+            # chunk of one output file is written in the same CSV dialect
+            if pa is not None:
+                try:
+                    table = pa.Table.from_pandas(results_df, preserve_index=False)
+                except pa.ArrowException as e:
+                    # e.g. object columns mixing numbers and text, which Arrow
+                    # cannot type; written as text, still by Arrow
+                    self.logger.warning(f"PyArrow could not type the results ({e}), writing object columns as text")
+                    text_cols = results_df.columns[results_df.dtypes == object]
+                    table = pa.Table.from_pandas(results_df.astype(dict.fromkeys(text_cols, "string")), preserve_index=False)
+                with open(output_file, "ab" if append else "wb") as f:
+                    pa_csv.write_csv(table, f, write_options=pa_csv.WriteOptions(include_header=not append))
+            else:
+                results_df.to_csv(output_file, **pandas_options)
+            if not append:
+                self.logger.info(f"[SUCCESS] Results saved to {output_file}")
             return True
         except Exception as e:
             self.logger.error(f"Error saving results to {output_file}: {e}")
@@ -351,26 +704,59 @@ class TransactionCategorizer:
         if not self.load_rules(self.config.rules_file, db_conn=db_conn):
             return False
 
-        bank_df = self.load_bank_statement(self.config.bank_statement_file)
-        if bank_df is None:
+        chunks = self.load_bank_statement_chunks(self.config.bank_statement_file)
+        if chunks is None:
             return False
 
+        # Each chunk is categorised and written before the next is read; only
+        # the columns the report needs are kept from each one
+        report_parts = []
         try:
-            results_df = self.categorize_transactions(bank_df)
+            for i, chunk in enumerate(chunks):
+                results_df = self.categorize_transactions(chunk)
+                if not self.save_results(results_df, self.config.output_file, append=i > 0):
+                    return False
+                report_parts.append(results_df[["Category", "Match_Score", "Auto_Approved"]])
         except Exception as e:
             self.logger.error(f"Categorization failed: {e}")
             return False
 
-        report = self.generate_report(results_df)
+        self._record_report(self.generate_report(pd.concat(report_parts, ignore_index=True)))
+        return True
+
+    def categorize_dataframe(self, bank_df: pd.DataFrame, db_conn=None) -> Optional[pd.DataFrame]:
+        """
+        run_categorization for a statement that is already in memory: the
+        categorised rows are returned (and written to output_file if one is
+        set) rather than round-tripped through CSV files. None on failure.
+        """
+        self.logger.info("Starting in-memory bank statement categorization")
+        if not self.load_rules(self.config.rules_file, db_conn=db_conn):
+            return None
+        if "Description" not in bank_df.columns:
+            self.logger.error("Missing 'Description' column in bank statement")
+            return None
+
+        try:
+            description = to_arrow_strings(bank_df["Description"])
+            bank_df = bank_df.assign(Description=description, Description_Clean=clean_description_series(description))
+            results_df = self.categorize_transactions(bank_df)
+        except Exception as e:
+            self.logger.error(f"Categorization failed: {e}")
+            return None
+        if self.config.output_file and not self.save_results(results_df, self.config.output_file):
+            return None
+
+        self._record_report(self.generate_report(results_df))
+        return results_df
+
+    def _record_report(self, report: Dict):
+        self.last_report = report
         self.logger.info("=== CATEGORIZATION REPORT ===")
         for key, value in report.items():
             self.logger.info(f"{key.replace('_', ' ').title()}: {value}")
 
-        if not self.save_results(results_df, self.config.output_file):
-            return False
-
         self.logger.info("[SUCCESS] Categorization process completed successfully")
-        return True
 
 # === MAIN EXECUTION ===
 def main():
@@ -1,13 +1,38 @@
 from pathlib import Path
 import streamlit as st
 import os
-import glob
-import sqlite3
-import pandas as pd
+import csv
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 from logic.session import BACKUP_DIR
+from logic.db import list_rule_dbs, write_transaction
 from logic.utils import load_usage_summary, load_ruleset_usage
 from logic.paths import DATA_DIR
 
+RULE_COLUMNS = ("description", "category")  # Columns imported from an uploaded rules CSV
+IMPORT_BLOCK_BYTES = 8 << 20  # Uploaded CSV bytes parsed and inserted at a time
+
+def _open_rules_csv(uploaded_csv):
+    """
+    Streaming Arrow reader over the description and category columns of an
+    uploaded CSV, matched case-insensitively, or None if either is missing.
+    Empty and NA-like cells are read as nulls.
+    """
+    header = next(csv.reader([uploaded_csv.readline().decode("utf-8-sig")]), [])
+    uploaded_csv.seek(0)
+    names = [name.strip().lower() for name in header]
+    if not set(RULE_COLUMNS).issubset(names):
+        return None
+    return pa_csv.open_csv(
+        uploaded_csv,
+        read_options=pa_csv.ReadOptions(column_names=names, skip_rows=1, block_size=IMPORT_BLOCK_BYTES),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=list(RULE_COLUMNS),
+            column_types={name: pa.string() for name in RULE_COLUMNS},
+            strings_can_be_null=True,
+        ),
+    )
+
 def show_admin_dashboard():
     st.subheader("Admin Dashboard")
 
@@ -25,16 +50,15 @@ def show_admin_dashboard():
 
     # 2a) If merging, pick an existing DB
     existing_db = None
-    db_paths = sorted(glob.glob(str(DATA_DIR / "rules_*.db")))
+    db_paths = list_rule_dbs()
     if mode == "Merge into existing database":
         if not db_paths:
             st.warning("No existing DBs to merge into—switch to 'Create new database'.")
             return
-        # Show only filenames in the dropdown
-        db_labels = [os.path.basename(p) for p in db_paths]
-        choice = st.selectbox("Select DB to merge into:", db_labels)
-        # Map the chosen label back to its full path
-        existing_db = next(p for p, label in zip(db_paths, db_labels) if label == choice)
+        # Show only filenames in the dropdown, mapped back to their full paths
+        db_by_label = {os.path.basename(p): p for p in db_paths}
+        choice = st.selectbox("Select DB to merge into:", list(db_by_label))
+        existing_db = db_by_label[choice]
 
     # 2b) If creating new, ask for a filename
     new_db_name = None
@@ -51,37 +75,47 @@ def show_admin_dashboard():
     uploaded_csv = st.file_uploader("Upload CSV to import", type=["csv"])
     if uploaded_csv:
         try:
-            df_new = pd.read_csv(uploaded_csv)
-            df_new.columns = df_new.columns.str.lower().str.strip()
-            if not {"description", "category"}.issubset(df_new.columns):
+            # Only the two rule columns are parsed, by Arrow's C++ reader and a
+            # block at a time, so large uploads are never held in memory whole
+            reader = _open_rules_csv(uploaded_csv)
+            if reader is None:
                 st.error("CSV must have at least 'description' and 'category' columns.")
                 return
 
             # Determine target DB path
             if mode == "Create new database":
                 db_path = str(DATA_DIR / f"{new_db_name}.db")
-                if os.path.exists(db_path):
-                    os.remove(db_path)
-                conn = sqlite3.connect(db_path)
-                df_existing = pd.DataFrame(columns=["description", "category"])
             else:
                 db_path = existing_db
-                conn = sqlite3.connect(db_path)
-                try:
-                    df_existing = pd.read_sql("SELECT description, category FROM rules", conn)
-                except Exception:
-                    df_existing = pd.DataFrame(columns=["description", "category"])
-
-            # Combine and dedupe
-            df_combined = pd.concat([df_existing, df_new[["description", "category"]]], ignore_index=True)
-            df_combined = df_combined.drop_duplicates().reset_index(drop=True)
-
-            # Write back to SQLite
-            conn.execute("DROP TABLE IF EXISTS rules")
-            df_combined.to_sql("rules", conn, index=False)
-            conn.close()
-
-            st.success(f"{mode} succeeded. Database '{db_path}' now has {len(df_combined)} unique rules.")
+
+            # SQLite skips rules that are already present, so the existing
+            # table never has to be read back or rewritten
+            with write_transaction(db_path) as conn:
+                if mode == "Create new database":
+                    conn.execute("DROP TABLE IF EXISTS rules")
+                conn.execute("CREATE TABLE IF NOT EXISTS rules (description TEXT, category TEXT)")
+                has_unique = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_rules_unique'"
+                ).fetchone()
+                if not has_unique:
+                    # Older DBs may hold duplicates; keep the first of each before indexing
+                    conn.execute(
+                        "DELETE FROM rules WHERE rowid NOT IN "
+                        "(SELECT MIN(rowid) FROM rules GROUP BY description, category)"
+                    )
+                    conn.execute("CREATE UNIQUE INDEX idx_rules_unique ON rules (description, category)")
+                for batch in reader:
+                    # Repeats within a block are dropped in Python (first one
+                    # kept) so SQLite only probes its index once per pair
+                    rows = dict.fromkeys(
+                        (description, category)
+                        for description, category in zip(batch.column(0).to_pylist(), batch.column(1).to_pylist())
+                        if description is not None and category is not None
+                    )
+                    conn.executemany("INSERT OR IGNORE INTO rules (description, category) VALUES (?, ?)", rows)
+                total = conn.execute("SELECT COUNT(*) FROM rules").fetchone()[0]
+
+            st.success(f"{mode} succeeded. Database '{db_path}' now has {total} unique rules.")
 
         except Exception as e:
             st.error(f"Failed to import CSV: {e}")
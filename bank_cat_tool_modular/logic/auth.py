@@ -3,7 +3,10 @@ import streamlit as st
 import bcrypt
 import json
 import os
+import hashlib
+import hmac
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 DEFAULT_HASHED_PASSWORD = "$2b$12$mg9gXX9ddxfwI7p6nKQRe.idw6We11jCJ6mxQNnjS0bzwtca6zVT2"  # 'password'
 DEFAULT_HASHED_PIN = "$2b$12$pvtnsxmS3atyJGYsTu0kGOi4K2h/xhZkhzZyPF3pV3N14EHtTLCD2"       # '1234'
@@ -22,7 +25,30 @@ def verify_password(password: str, hashed: str) -> bool:
     except Exception:
         return False
 
+def _password_fingerprint(password: str, hashed: str) -> bytes:
+    # Keyed on the stored hash, so it stops matching once the password changes
+    return hashlib.blake2b(password.encode(), key=hashed.encode()[:64]).digest()
+
+def verify_password_cached(password: str, hashed: str) -> bool:
+    """
+    verify_password, remembering a successful check in the session so the
+    same password is not run through bcrypt again. Failures are never cached.
+    """
+    fingerprints = st.session_state.setdefault("_pw_fp", set())
+    fingerprint = _password_fingerprint(password, hashed)
+    if any(hmac.compare_digest(fingerprint, known) for known in fingerprints):
+        return True
+    if verify_password(password, hashed):
+        fingerprints.add(fingerprint)
+        return True
+    return False
+
+@st.cache_resource
 def load_credentials():
+    """
+    Credentials from CREDENTIALS_PATH, read once per process and reused across
+    reruns; save_credentials drops the cached copy.
+    """
     if not os.path.exists(CREDENTIALS_PATH):
         os.makedirs(CREDENTIALS_DIR, exist_ok=True)
         default = {
@@ -38,8 +64,15 @@ def load_credentials():
 
 def save_credentials(creds):
     os.makedirs(CREDENTIALS_DIR, exist_ok=True)
-    with open(CREDENTIALS_PATH, "w") as f:
+    # Written beside the real file and swapped in, so a crash mid-write can
+    # never leave a truncated credentials.json behind
+    tmp_path = CREDENTIALS_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
         json.dump(creds, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, CREDENTIALS_PATH)
+    load_credentials.clear()
 
 def enforce_session_timeout():
     if "login_time" in st.session_state:
@@ -48,6 +81,10 @@ def enforce_session_timeout():
             st.session_state.clear()
             st.rerun()
 
+def _begin_credentials_update():
+    # Runs before the rerun, so the button is already disabled while hashing
+    st.session_state["_updating"] = True
+
 def admin_login():
     creds = load_credentials()
     st.subheader("Admin Login")
@@ -63,7 +100,13 @@ def admin_login():
         confirm_password = st.text_input("Confirm Password", type="password", key="reset_confirm")
         new_pin = st.text_input("Set Recovery PIN (digits only)", type="password", key="reset_pin")
 
-        if st.button("Update Credentials", key="update_creds_btn"):
+        st.button(
+            "Update Credentials",
+            key="update_creds_btn",
+            on_click=_begin_credentials_update,
+            disabled=st.session_state.get("_updating", False),
+        )
+        if st.session_state.get("_updating", False):
             if not new_username or not new_password or not new_pin:
                 st.error("Fields cannot be empty.")
             elif new_password != confirm_password:
@@ -71,22 +114,27 @@ def admin_login():
             elif not new_pin.isdigit() or len(new_pin) < 4:
                 st.error("PIN must be numeric and at least 4 digits.")
             else:
+                # bcrypt releases the GIL, so both hashes run side by side
+                with ThreadPoolExecutor(max_workers=2) as pool:
+                    hashed_password, hashed_pin = pool.map(hash_password, (new_password, new_pin))
                 save_credentials({
                     "username": new_username,
-                    "password": hash_password(new_password),
-                    "recovery_pin": hash_password(new_pin),
+                    "password": hashed_password,
+                    "recovery_pin": hashed_pin,
                     "first_run": False
                 })
                 st.success("Credentials updated. Please log in again.")
                 st.session_state.clear()
                 st.rerun()
+            # Re-enabled on the next rerun, i.e. once the inputs are corrected
+            st.session_state["_updating"] = False
         return
 
     username = st.text_input("Username", key="login_username_input")
     password = st.text_input("Password", type="password", key="login_password_input")
 
     if st.button("Login", key="login_btn"):
-        if username == creds["username"] and verify_password(password, creds["password"]):
+        if username == creds["username"] and verify_password_cached(password, creds["password"]):
             if not creds["password"].startswith("$2b$"):
                 creds["password"] = hash_password(password)
                 save_credentials(creds)
@@ -102,7 +150,7 @@ def admin_login():
     with st.expander("Forgot Password?"):
         pin_attempt = st.text_input("Enter Recovery PIN", type="password", key="pin_reset_input")
         if st.button("Verify PIN and Reset Credentials", key="reset_btn"):
-            if verify_password(pin_attempt, creds.get("recovery_pin", "")):
+            if verify_password_cached(pin_attempt, creds.get("recovery_pin", "")):
                 st.session_state["force_password_reset"] = True
                 st.session_state["admin_logged_in"] = True
                 st.success("PIN verified. You may now reset your credentials.")
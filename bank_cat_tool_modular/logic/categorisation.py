@@ -1,15 +1,21 @@
 # === IMPORTS ===
-import sqlite3
-import os, tempfile, pandas as pd  # Standard libraries for file handling and data processing
+import pandas as pd  # Data processing
 from fuzzy_logic_improved import TransactionCategorizer, Config  # Custom logic for transaction categorisation
 from preprocess_bank_data import extract_values_column  # Preprocessing utility for extracting transaction descriptions
-from .utils import read_uploaded_file  # Helper to read uploaded Excel or CSV files
+from .utils import read_uploaded_file, load_usage_summary, load_ruleset_usage  # Upload reader and cached dashboard queries
 from collections import namedtuple
 import datetime
 from logic.paths import DATA_DIR
+import streamlit as st
+from logic.db import get_conn, write_transaction
 
+@st.cache_resource(show_spinner=False)
 def ensure_analytics_table(db_path: str = "analytics.db"):
-    with sqlite3.connect(db_path) as conn:
+    """
+    Creates the usage_stats table and its indexes if missing. Cached, so the
+    schema is only checked once per process, when the app starts.
+    """
+    with write_transaction(db_path) as conn:
         conn.execute("""
         CREATE TABLE IF NOT EXISTS usage_stats (
             id                          INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -25,39 +31,92 @@ def ensure_analytics_table(db_path: str = "analytics.db"):
             avg_confidence              REAL
         )
         """)
+        # Lets the rule-set usage counts be answered from the index alone
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_usage_rule_set ON usage_stats(rule_set)")
+        # Covers load_usage_summary: rows come out already grouped by day, so
+        # the summary is one index scan with no sort and no table lookups
+        conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_usage_run_date ON usage_stats(
+            date(run_at), run_at, total_transactions, categorised_transactions,
+            auto_approved_count, avg_confidence
+        )
+        """)
+
+# The usage row written after every successful run
+USAGE_INSERT_SQL = """
+    INSERT INTO usage_stats (
+        session_id, run_at, rule_set, custom_rules,
+        use_tax_rules, total_transactions,
+        categorised_transactions, uncategorised_transactions,
+        auto_approved_count, avg_confidence
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Deletion tables for the filename parts, applied in C by str.translate
+_CLIENT_NAME_DROP = str.maketrans("", "", "".join(chr(b) for b in range(128) if not (chr(b).isalnum() or chr(b) in "_-")))
+_CCH_CODE_DROP = str.maketrans("", "", "".join(chr(b) for b in range(128) if not chr(b).isalnum()))
+
+def _keep_chars(text: str, drop_table: dict, extra: str = "") -> str:
+    """Alphanumerics of text plus the characters in extra"""
+    if text.isascii():
+        return text.translate(drop_table)
+    # The tables only cover ASCII; Unicode letters and digits are kept too
+    return "".join(c for c in text if c.isalnum() or c in extra)
+
+def record_usage(session_id, custom_rules: bool, use_tax_rules: bool, report: dict):
+    """Writes one usage_stats row for a categorisation run and refreshes the dashboard caches."""
+    # Determine which ruleset was used
+    rule_set = (
+        "custom"
+        if custom_rules
+        else ("tax" if use_tax_rules else "accounting")
+    )
+
+    # Insert the usage stats with proper Python-native types; the write is
+    # serialised with every other session's
+    with write_transaction("analytics.db") as conn:
+        conn.execute(USAGE_INSERT_SQL, (
+            session_id,
+            datetime.datetime.utcnow().isoformat(),
+            rule_set,
+            int(custom_rules),                     # 0 or 1
+            int(use_tax_rules),                    # 0 or 1
+            int(report["total_transactions"]),     # cast to int
+            int(report["categorised"]),            # cast to int
+            int(report["uncategorised"]),          # cast to int
+            int(report["auto_approved"]),          # cast to int
+            float(report["avg_confidence"])        # cast to float
+        ))
+
+    # The admin dashboard caches these; show the new run straight away
+    load_usage_summary.clear()
+    load_ruleset_usage.clear()
 
 CategorisationResult = namedtuple("CategorisationResult", ["success", "output_df", "custom_filename", "original_df", "report"])
 
-def run_categorisation(bank_file, sheet_to_process, rules_path, client_name, cch_code, raw_date, user_temp_dir, session_id, built_in_db_path=None, use_tax_rules: bool = False, refund_edge_cases_path: str = "refund_edge_cases.csv"):
-    ensure_analytics_table("analytics.db")
-    
+def run_categorisation(bank_file, sheet_to_process, rules_path, client_name, cch_code, raw_date, session_id, built_in_db_path=None, use_tax_rules: bool = False, refund_edge_cases_path: str = "refund_edge_cases.csv"):
     # Load the uploaded bank file and extract the relevant sheet
     original_df = read_uploaded_file(bank_file, sheet_name=sheet_to_process)
 
     # Preprocess the data to extract key values (e.g., transaction descriptions)
-    preprocessed_df = extract_values_column(original_df.copy())
+    # extract_values_column only assigns whole columns, which a shallow copy
+    # keeps away from original_df without duplicating every column's data
+    preprocessed_df = extract_values_column(original_df.copy(deep=False))
 
     if "Description" not in preprocessed_df.columns:
         print("[ERROR] Missing 'Description' column in processed data.")
         return CategorisationResult(False, pd.DataFrame(), custom_filename, original_df)
 
-    # Write the preprocessed dataframe to a temporary CSV file
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".csv", dir=user_temp_dir) as tmp_bank:
-        preprocessed_df.to_csv(tmp_bank.name, index=False)
-        tmp_bank_path = tmp_bank.name  # Store the path to the temp CSV
-
     # Sanitize and format input data to build a safe and consistent output filename
-    safe_client = "".join(c for c in client_name if c.isalnum() or c in ("_", "-")).strip().replace(" ", "_")
-    safe_cch = "".join(c for c in cch_code if c.isalnum()).strip().upper()
+    safe_client = _keep_chars(client_name, _CLIENT_NAME_DROP, "_-").strip().replace(" ", "_")
+    safe_cch = _keep_chars(cch_code, _CCH_CODE_DROP).strip().upper()
     final_date = f"YE{raw_date}"  # Add 'YE' prefix to the date
     custom_filename = f"{safe_client}_{safe_cch}_{final_date}_{session_id}.csv"  # Construct the final filename
-    output_path = os.path.join(user_temp_dir, custom_filename)  # Full path for the output file
 
-    # Create configuration for the categorisation process
+    # Create configuration for the categorisation process. The statement is
+    # passed in memory, so no input or output CSV is written
     config = Config(
-        bank_statement_file      = tmp_bank_path,
         rules_file               = rules_path,
-        output_file              = output_path,
         use_tax_rules          = use_tax_rules,
         refund_edge_cases_file = refund_edge_cases_path or str(DATA_DIR / "refund_edge_cases.csv"),
         directional_file       = str(DATA_DIR / "directional_merchants.csv"),
@@ -67,48 +126,14 @@ def run_categorisation(bank_file, sheet_to_process, rules_path, client_name, cch
     categorizer = TransactionCategorizer(config)
     db_conn = None
     if not rules_path and built_in_db_path:
-        db_conn = sqlite3.connect(built_in_db_path)
-    success = categorizer.run_categorization(db_conn=db_conn)
-    if db_conn:
-        db_conn.close()
-
-
-    # Return status, output file path, filename, and original (unprocessed) dataframe
-    output_df = pd.read_csv(output_path)
+        db_conn = get_conn(built_in_db_path)
+    output_df = categorizer.categorize_dataframe(preprocessed_df, db_conn=db_conn)
+    if output_df is None:
+        return CategorisationResult(False, pd.DataFrame(), custom_filename, original_df, None)
 
-    report = categorizer.generate_report(output_df)
+    # Already worked out by the categoriser; the output is not scanned again
+    report = categorizer.last_report
 
-# Inside your run_categorisation function, after you've computed `report`:
-    # Determine which ruleset was used
-    rule_set = (
-        "custom"
-        if rules_path
-        else ("tax" if use_tax_rules else "accounting")
-    )
-
-    # Ensure analytics table exists
-    ensure_analytics_table("analytics.db")
-
-    # Insert the usage stats with proper Python-native types
-    with sqlite3.connect("analytics.db") as conn:
-        conn.execute("""
-            INSERT INTO usage_stats (
-                session_id, run_at, rule_set, custom_rules,
-                use_tax_rules, total_transactions,
-                categorised_transactions, uncategorised_transactions,
-                auto_approved_count, avg_confidence
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            session_id,
-            datetime.datetime.utcnow().isoformat(),
-            rule_set,
-            int(bool(rules_path)),                 # 0 or 1
-            int(use_tax_rules),                    # 0 or 1
-            int(report["total_transactions"]),     # cast to int
-            int(report["categorised"]),            # cast to int
-            int(report["uncategorised"]),          # cast to int
-            int(report["auto_approved"]),          # cast to int
-            float(report["avg_confidence"])        # cast to float
-        ))
+    record_usage(session_id, bool(rules_path), use_tax_rules, report)
 
-    return CategorisationResult(success, output_df, custom_filename, original_df, report)
+    return CategorisationResult(True, output_df, custom_filename, original_df, report)
@@ -0,0 +1,60 @@
+# === logic/db.py ===
+import os
+import sqlite3
+import threading
+from contextlib import closing, contextmanager
+import streamlit as st
+from logic.paths import DATA_DIR
+
+@st.cache_resource
+def get_conn(db_path: str) -> sqlite3.Connection:
+    """
+    Returns a SQLite connection for `db_path` that is opened once per process and
+    reused across reruns, so the schema and page cache stay warm. Reads go
+    through a memory map of up to 256 MB, served straight from the OS cache.
+    The connection is shared by every session thread, so use it for reads only;
+    writes go through write_transaction.
+    """
+    conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+    conn.executescript("""
+        PRAGMA journal_mode=WAL;
+        PRAGMA synchronous=NORMAL;
+        PRAGMA temp_store=MEMORY;
+        PRAGMA cache_size=-65536;
+        PRAGMA mmap_size=268435456;
+    """)
+    return conn
+
+# Held for the whole of every write, so sessions never interleave transactions
+_WRITE_LOCK = threading.Lock()
+
+@contextmanager
+def write_transaction(db_path: str):
+    """
+    Yields a short-lived connection to `db_path` inside one transaction, which
+    is committed on exit and rolled back if the block raises. Writes from all
+    sessions are serialised, and the shared read connection never sees a
+    transaction that is still open.
+    """
+    with _WRITE_LOCK, closing(sqlite3.connect(db_path, isolation_level=None, timeout=30)) as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _list_rule_dbs(dir_mtime_ns: int) -> list:
+    # scandir yields names without a stat per entry, unlike glob
+    with os.scandir(DATA_DIR) as entries:
+        return sorted(
+            entry.path for entry in entries
+            if entry.name.startswith("rules_") and entry.name.endswith(".db")
+        )
+
+def list_rule_dbs() -> list:
+    """
+    Sorted paths of the rules_*.db files in DATA_DIR. The scan is cached on the
+    directory's mtime, so reruns only cost one stat until a DB is added or removed.
+    """
+    return _list_rule_dbs(os.stat(DATA_DIR).st_mtime_ns)
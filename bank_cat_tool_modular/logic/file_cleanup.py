@@ -1,20 +1,20 @@
 # === IMPORTS ===
-import os, time, tempfile  # Libraries for file operations, time tracking, and temporary directory access
+import os, stat, time, tempfile  # Libraries for file operations, file types, time tracking, and temporary directory access
 
 def cleanup_temp_files(age_seconds=3600):
     """
     Deletes temporary files older than the specified age (default: 1 hour = 3600 seconds)
     """
-    now = time.time()  # Current time in seconds since epoch
+    cutoff = time.time() - age_seconds  # Files last modified before this are deleted
     tmp_dir = tempfile.gettempdir()  # Path to the system's temporary directory
 
-    # Iterate over each file in the temporary directory
-    for f in os.listdir(tmp_dir):
-        fpath = os.path.join(tmp_dir, f)  # Full path to the file
-
-        # Check if it's a file and if it's older than the specified age
-        if os.path.isfile(fpath) and os.path.getmtime(fpath) < now - age_seconds:
+    # One scandir pass; each entry is stat'ed once (without following symlinks)
+    with os.scandir(tmp_dir) as entries:
+        for entry in entries:
             try:
-                os.remove(fpath)  # Attempt to delete the file
-            except:
-                pass  # Silently ignore errors (e.g., permission issues)
+                info = entry.stat(follow_symlinks=False)
+                # Only regular files older than the cutoff are removed
+                if stat.S_ISREG(info.st_mode) and info.st_mtime < cutoff:
+                    os.unlink(entry.path)
+            except OSError:
+                pass  # Silently ignore errors (e.g., permission issues, files removed meanwhile)
@@ -1,9 +1,9 @@
 import tempfile  # Provides functions to access the system's temporary file directory
 import os        # OS-level file and path operations
-import uuid      # For generating a unique session identifier
+import secrets   # For generating a unique session identifier
 
 # === Unique session ID and temporary directory ===
-SESSION_ID = str(uuid.uuid4())[:8]  # Generate a short unique session ID using UUID
+SESSION_ID = secrets.token_hex(4)  # Generate a short unique session ID (8 random hex characters)
 USER_TEMP_DIR = os.path.join(tempfile.gettempdir(), f"session_{SESSION_ID}")  # Create a session-specific temp folder
 os.makedirs(USER_TEMP_DIR, exist_ok=True)  # Ensure the temp folder exists; create it if not
 
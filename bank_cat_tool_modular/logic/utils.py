@@ -1,40 +1,280 @@
 import pandas as pd  # For data manipulation and Excel I/O
+import streamlit as st  # Caching and inline UI helpers
 from io import BytesIO  # For handling in-memory byte streams
+import openpyxl  # Streaming Excel export
+import zipfile  # XLSX packaging for the direct writer
+import math  # Finite-number checks for XLSX cells
+import datetime  # Excel date serials
+import re  # Stripping characters XML cannot hold
+import numpy as np  # Numeric scalar types in XLSX cells
+from xml.sax.saxutils import escape as xml_escape  # Escaping XLSX cell text
+from openpyxl.cell import WriteOnlyCell  # Cells with an explicit data type
 import hashlib  # For password hashing
+import hmac  # Constant-time digest comparison
+import base64  # Storing raw password digests as text
 import json  # For reading and writing JSON files
 import os  # For file system operations
-import sqlite3
+import html  # Escaping help-widget text
+from string import Template  # Help-widget markup
+from functools import lru_cache  # Reusing rendered help markup
+from logic.db import get_conn  # Cached per-process SQLite connections
 
 # --- Convert DataFrame to Excel bytes ---
+# Control characters are not allowed in XML 1.0 and are dropped
+_RE_XML_ILLEGAL = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+def _text_cell(ws, value):
+    # openpyxl would otherwise store a string such as "=SUM(...)" as a formula
+    cell = WriteOnlyCell(ws, value=value)
+    cell.data_type = "s"
+    return cell
+
+def _excel_value(ws, value):
+    if not isinstance(value, str):
+        return value
+    # openpyxl rejects the control characters XML cannot hold
+    value = _RE_XML_ILLEGAL.sub("", value)
+    return _text_cell(ws, value) if value.startswith("=") else value
+
+def _naive_datetimes(df):
+    """df with timezone-aware datetime columns reduced to their wall-clock time, which is all Excel can store"""
+    aware = [i for i, dtype in enumerate(df.dtypes) if isinstance(dtype, pd.DatetimeTZDtype)]
+    if not aware:
+        return df
+    df = df.copy(deep=False)
+    for i in aware:
+        df.isetitem(i, df.iloc[:, i].dt.tz_localize(None))
+    return df
+
+def to_csv_bytes(df):
+    """
+    Converts a pandas DataFrame to UTF-8 CSV bytes for download. pandas
+    encodes straight into the buffer, so no intermediate str of the whole
+    file is built.
+    """
+    output = BytesIO()
+    df.to_csv(output, index=False, encoding="utf-8")
+    return output.getvalue()
+
 def to_excel(df):
     """
     Converts a pandas DataFrame to an in-memory Excel file (as bytes),
     suitable for download or streaming in web apps like Streamlit.
+    Rows are streamed into a write-only openpyxl workbook as plain values,
+    skipping pandas' per-cell formatting.
     """
+    df = _naive_datetimes(df)
+    if len(df) > EXCEL_FAST_ROWS:
+        return to_excel_fast(df)
     output = BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df.to_excel(writer, index=False, sheet_name='Categorised')
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Categorised")
+    ws.append([str(col) for col in df.columns])
+    # Missing values become empty cells, as with pandas' to_excel
+    values = df.astype(object).where(df.notna(), None)
+    for row in values.itertuples(index=False, name=None):
+        ws.append([_excel_value(ws, v) for v in row])
+    wb.save(output)
+    return output.getvalue()
+
+# --- Direct XLSX writer for large exports ---
+EXCEL_FAST_ROWS = 20_000  # Larger frames skip openpyxl and are written as raw sheet XML
+
+_XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Categorised" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+        'Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    # Same number formats openpyxl gives datetimes, dates, times and timedeltas
+    "xl/styles.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<numFmts count="3"><numFmt numFmtId="164" formatCode="yyyy-mm-dd h:mm:ss"/>'
+        '<numFmt numFmtId="165" formatCode="yyyy-mm-dd"/><numFmt numFmtId="166" formatCode="[hh]:mm:ss"/></numFmts>'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/><family val="2"/></font></fonts>'
+        '<fills count="2"><fill><patternFill/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="5"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<xf numFmtId="165" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<xf numFmtId="21" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<xf numFmtId="166" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>'
+    ),
+}
+# cellXfs positions in styles.xml
+_XLSX_DATETIME, _XLSX_DATE, _XLSX_TIME, _XLSX_TIMEDELTA = 1, 2, 3, 4
+_EXCEL_EPOCH = datetime.datetime(1899, 12, 30)
+_EXCEL_DAY = datetime.timedelta(days=1)
+_XLSX_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_XLSX_SHEET_TAIL = '</sheetData></worksheet>'
+
+def _xlsx_text_cell(value) -> str:
+    text = xml_escape(_RE_XML_ILLEGAL.sub("", str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+def _xlsx_cell(value) -> str:
+    if isinstance(value, (bool, np.bool_)):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, np.integer)):
+        return f"<c><v>{int(value)}</v></c>"
+    if isinstance(value, (float, np.floating)):
+        return f"<c><v>{float(value)!r}</v></c>" if math.isfinite(value) else "<c/>"
+    if value is None or value is pd.NaT or (not isinstance(value, str) and pd.isna(value)):
+        return "<c/>"
+    # Dates are day serials with a date format, as openpyxl writes them
+    if isinstance(value, datetime.datetime):
+        return _xlsx_serial_cell((value.replace(tzinfo=None) - _EXCEL_EPOCH) / _EXCEL_DAY, _XLSX_DATETIME)
+    if isinstance(value, datetime.date):
+        return _xlsx_serial_cell((value - _EXCEL_EPOCH.date()).days, _XLSX_DATE)
+    if isinstance(value, datetime.time):
+        seconds = value.hour * 3600 + value.minute * 60 + value.second + value.microsecond / 1e6
+        return _xlsx_serial_cell(seconds / 86400, _XLSX_TIME)
+    if isinstance(value, datetime.timedelta):
+        return _xlsx_serial_cell(value / _EXCEL_DAY, _XLSX_TIMEDELTA)
+    return _xlsx_text_cell(value)
+
+def _xlsx_serial_cell(serial, style: int) -> str:
+    return f'<c s="{style}"><v>{serial!r}</v></c>'
+
+def _xlsx_serial_column(serials: pd.Series, style: int) -> list:
+    values = serials.to_numpy(dtype=float, na_value=np.nan).tolist()
+    return [f'<c s="{style}"><v>{v!r}</v></c>' if math.isfinite(v) else "<c/>" for v in values]
+
+def _xlsx_column(col: pd.Series) -> list:
+    """Cell XML for every value of a column; numeric columns skip the per-value type checks"""
+    if pd.api.types.is_datetime64_any_dtype(col):
+        return _xlsx_serial_column((col - _EXCEL_EPOCH) / _EXCEL_DAY, _XLSX_DATETIME)
+    if pd.api.types.is_timedelta64_dtype(col):
+        return _xlsx_serial_column(col / _EXCEL_DAY, _XLSX_TIMEDELTA)
+    if pd.api.types.is_integer_dtype(col) and not col.hasnans:
+        return [f"<c><v>{v}</v></c>" for v in col.tolist()]
+    if pd.api.types.is_numeric_dtype(col) and not pd.api.types.is_bool_dtype(col):
+        values = col.to_numpy(dtype=float, na_value=np.nan).tolist()
+        return [f"<c><v>{v!r}</v></c>" if math.isfinite(v) else "<c/>" for v in values]
+    return [_xlsx_cell(v) for v in col.tolist()]
+
+def to_excel_fast(df):
+    """
+    Value-only XLSX of df (one 'Categorised' sheet, header row first) built
+    by writing the sheet XML straight into the zip, with no per-cell objects.
+    Numbers, booleans and dates keep their type, with the same date formats
+    as the openpyxl path; everything else is written as text.
+    """
+    df = _naive_datetimes(df)
+    output = BytesIO()
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, xml in _XLSX_PARTS.items():
+            zf.writestr(name, xml)
+        with zf.open("xl/worksheets/sheet1.xml", "w") as sheet:
+            sheet.write(_XLSX_SHEET_HEAD.encode())
+            header = "".join(_xlsx_text_cell(col) for col in df.columns)
+            sheet.write(f"<row>{header}</row>".encode())
+            columns = [_xlsx_column(df.iloc[:, j]) for j in range(df.shape[1])]
+            for start in range(0, len(df), EXCEL_FAST_ROWS):
+                rows = zip(*(col[start:start + EXCEL_FAST_ROWS] for col in columns))
+                sheet.write("".join(f"<row>{''.join(cells)}</row>" for cells in rows).encode())
+            sheet.write(_XLSX_SHEET_TAIL.encode())
     return output.getvalue()
 
 # --- Universal file reader (CSV or Excel) ---
+@st.cache_data(show_spinner=False, max_entries=8)
+def _read_file_bytes(raw: bytes, name: str, sheet_name=None) -> pd.DataFrame:
+    if name.endswith(".csv"):
+        try:
+            return pd.read_csv(BytesIO(raw), engine="pyarrow")
+        except pd.errors.ParserError:
+            # Fall back to the C parser for files Arrow's reader rejects
+            return pd.read_csv(BytesIO(raw))
+    elif name.endswith((".xlsx", ".xls")):
+        return pd.read_excel(BytesIO(raw), sheet_name=sheet_name or 0)
+    else:
+        raise ValueError("Unsupported file format")
+
 def read_uploaded_file(file, sheet_name=None):
     """
     Reads an uploaded file and returns it as a pandas DataFrame.
-    Supports CSV and Excel (.xlsx, .xls) formats.
+    Supports CSV and Excel (.xlsx, .xls) formats. Parsed frames are cached
+    on the file's contents, so reruns of the same upload do no file IO;
+    each call gets its own copy.
     """
-    if file.name.endswith(".csv"):
-        return pd.read_csv(file)
-    elif file.name.endswith((".xlsx", ".xls")):
-        return pd.read_excel(file, sheet_name=sheet_name or 0)
-    else:
-        raise ValueError("Unsupported file format")
+    return _read_file_bytes(file.getvalue(), file.name, sheet_name)
 
 # --- Admin password hashing ---
-def hash_password(password):
+# scrypt cost parameters: memory-hard, so guessing stays expensive even where
+# SHA-256 runs in hardware. n * r * 128 bytes = 32 MiB per hash.
+SCRYPT_N, SCRYPT_R, SCRYPT_P = 2 ** 15, 8, 1
+SCRYPT_MAXMEM = 64 * 1024 * 1024
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=SCRYPT_MAXMEM, dklen=32)
+
+def hash_password(password, salt=None):
     """
-    Hashes the given password using SHA-256 and returns the hex digest.
+    Hashes the given password with salted scrypt and returns
+    'scrypt$n$r$p$salt$hash' (salt and hash hex-encoded), so the cost
+    parameters travel with each stored hash.
     """
-    return hashlib.sha256(password.encode()).hexdigest()
+    if salt is None:
+        salt = os.urandom(16)
+    digest = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${salt.hex()}${digest.hex()}"
+
+def verify_password(password, stored):
+    """
+    Checks a password against a hash_password result in constant time.
+    Unsalted SHA-256 digests from older credentials files (base64 or hex)
+    are still accepted.
+    """
+    try:
+        if stored.startswith("scrypt$"):
+            _, n, r, p, salt, expected = stored.split("$")
+            actual = _scrypt(password, bytes.fromhex(salt), int(n), int(r), int(p))
+            return hmac.compare_digest(actual, bytes.fromhex(expected))
+        expected = bytes.fromhex(stored) if len(stored) == 64 else base64.b64decode(stored, validate=True)
+    except (TypeError, ValueError):
+        return False
+    return hmac.compare_digest(hashlib.sha256(password.encode()).digest(), expected)
 
 # --- Load admin credentials from JSON ---
 def load_credentials():
@@ -58,36 +298,30 @@ def save_credentials(creds):
     with open("credentials.json", "w") as f:
         json.dump(creds, f)
 
-import streamlit as st
-
-import base64
 
+@st.cache_data(show_spinner=False)
 def load_icon_base64(path: str) -> str:
-    """Load a local PNG icon and convert it to a base64 data URI."""
+    """Load a local PNG icon and convert it to a base64 data URI (once per path)."""
     with open(path, "rb") as img_file:
         encoded = base64.b64encode(img_file.read()).decode("utf-8")
         return f"data:image/png;base64,{encoded}"
 
-def inline_label_with_help(label: str, help_text: str):
-    icon_data_uri = load_icon_base64("help.png")  # adjust if needed
-
-    st.markdown(f"""
+# Help-widget markup, parsed once; labels and tooltips are escaped on substitution
+_LABEL_WITH_HELP_TMPL = Template("""
     <div style="display: flex; align-items: center; gap: 6px; font-weight: 400; margin-bottom: -2px;">
-        <span>{label}</span>
-        <div title="{help_text}" style="padding: 8px; border-radius: 6px; cursor: help; display: flex; align-items: center; justify-content: center;">
-            <img src="{icon_data_uri}"
+        <span>$label</span>
+        <div title="$help" style="padding: 8px; border-radius: 6px; cursor: help; display: flex; align-items: center; justify-content: center;">
+            <img src="$uri"
                  width="20" height="20"
                  style="pointer-events: none;" />
         </div>
     </div>
-    """, unsafe_allow_html=True)
-
+    """)
 
-def inline_text_input_with_help(label: str, help_text: str, key: str, max_chars=None):
-    st.markdown(f"""
+_TEXT_INPUT_HELP_TMPL = Template("""
         <div style="display: flex; align-items: center; gap: 6px; margin-bottom: -8px;">
-            <span style="font-weight: 400;">{label}</span>
-            <span style="cursor: help;" title="{help_text}">
+            <span style="font-weight: 400;">$label</span>
+            <span style="cursor: help;" title="$help">
                 <svg xmlns="http://www.w3.org/2000/svg" height="16" width="16" viewBox="0 0 24 24"
                     fill="none" stroke="#6c757d" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
                     <circle cx="12" cy="12" r="10"/>
@@ -96,7 +330,21 @@ def inline_text_input_with_help(label: str, help_text: str, key: str, max_chars=
                 </svg>
             </span>
         </div>
-    """, unsafe_allow_html=True)
+    """)
+
+@lru_cache(maxsize=64)
+def _render_help_html(template: Template, label: str, help_text: str, uri: str = "") -> str:
+    """Filled-in help markup, built once per label so reruns reuse the same string."""
+    return template.substitute(label=html.escape(label), help=html.escape(help_text), uri=uri)
+
+def inline_label_with_help(label: str, help_text: str):
+    icon_data_uri = load_icon_base64("help.png")  # adjust if needed
+
+    st.markdown(_render_help_html(_LABEL_WITH_HELP_TMPL, label, help_text, icon_data_uri), unsafe_allow_html=True)
+
+
+def inline_text_input_with_help(label: str, help_text: str, key: str, max_chars=None):
+    st.markdown(_render_help_html(_TEXT_INPUT_HELP_TMPL, label, help_text), unsafe_allow_html=True)
 
     # Use a non-empty hidden label to suppress Streamlit warnings
     return st.text_input(
@@ -106,38 +354,41 @@ def inline_text_input_with_help(label: str, help_text: str, key: str, max_chars=
         max_chars=max_chars
     )
 
+@st.cache_data(ttl=60, show_spinner=False)
 def load_usage_summary(db_path: str = "analytics.db") -> pd.DataFrame:
-    df = pd.read_sql_query("SELECT * FROM usage_stats", sqlite3.connect(db_path))
-    if df.empty:
-        return df
-
-    # Ensure numeric
-    for col in ["total_transactions", "categorised_transactions", "uncategorised_transactions", "auto_approved_count", "avg_confidence"]:
-        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
-
-    df["run_date"] = pd.to_datetime(df["run_at"]).dt.date
-    return (
-        df.groupby("run_date")
-          .agg(
-            runs=("id", "count"),
-            total_transactions=("total_transactions", "sum"),
-            categorised_transactions=("categorised_transactions", "sum"),
-            auto_approved_count=("auto_approved_count", "sum"),
-            avg_confidence=("avg_confidence", "mean")
-          )
-          .reset_index()
+    """
+    Returns one row per run date with columns:
+      run_date, runs, total_transactions, categorised_transactions,
+      auto_approved_count, avg_confidence
+    The grouping is done by SQLite, so only the summary rows are loaded.
+    """
+    df = pd.read_sql_query(
+        """
+        SELECT date(run_at)                             AS run_date,
+               COUNT(id)                                AS runs,
+               SUM(COALESCE(total_transactions, 0))       AS total_transactions,
+               SUM(COALESCE(categorised_transactions, 0)) AS categorised_transactions,
+               SUM(COALESCE(auto_approved_count, 0))      AS auto_approved_count,
+               AVG(COALESCE(avg_confidence, 0))           AS avg_confidence
+        FROM usage_stats
+        GROUP BY run_date
+        ORDER BY run_date
+        """,
+        get_conn(db_path)
     )
+    # SQLite's date() always yields ISO dates, so skip format inference
+    df["run_date"] = pd.to_datetime(df["run_date"], format="%Y-%m-%d").dt.date
+    return df
 
 
+@st.cache_data(ttl=60, show_spinner=False)
 def load_ruleset_usage(db_path: str = "analytics.db") -> pd.DataFrame:
     """
     Returns a DataFrame with columns:
       rule_set, runs
     """
-    with sqlite3.connect(db_path) as conn:
-        df = pd.read_sql_query(
-            "SELECT rule_set, COUNT(*) AS runs FROM usage_stats GROUP BY rule_set",
-            conn
-        )
-    return df
+    return pd.read_sql_query(
+        "SELECT rule_set, COUNT(*) AS runs FROM usage_stats GROUP BY rule_set",
+        get_conn(db_path)
+    )
 
@@ -1,6 +1,7 @@
 import streamlit as st
 from ui.routes import route_page
 from ui_layout.styles import apply_custom_styles
+from logic.categorisation import ensure_analytics_table
 
 st.set_page_config(page_title="BA Tool", layout="wide")
 
@@ -16,5 +17,6 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
+ensure_analytics_table("analytics.db")  # cached: runs once per process
 apply_custom_styles()
 route_page()
@@ -0,0 +1,68 @@
+import contextlib
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("streamlit")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ui_layout import ui_inputs
+
+
+class FakeStreamlit:
+    """Just the calls _excel_download_button makes, with the Prepare click scripted."""
+
+    def __init__(self):
+        self.session_state = {}
+        self.clicked = False
+        self.downloads = []
+
+    def button(self, label, key=None):
+        return self.clicked
+
+    def spinner(self, text):
+        return contextlib.nullcontext()
+
+    def download_button(self, **kwargs):
+        self.downloads.append(kwargs["key"])
+
+
+@pytest.fixture
+def fake_st(monkeypatch):
+    fake = FakeStreamlit()
+    built = []
+    monkeypatch.setattr(ui_inputs, "st", fake)
+    monkeypatch.setattr(ui_inputs, "_excel_bytes", lambda df: built.append(df) or b"xlsx")
+    fake.built = built
+    return fake
+
+
+def render(df):
+    ui_inputs._excel_download_button(df, label="Download Excel", file_name="out.xlsx", key="xlsx_full")
+
+
+def test_new_result_frame_needs_a_new_prepare_click(fake_st):
+    first = pd.DataFrame({"Description": ["tesco"], "Category": ["Groceries"]})
+    second = pd.DataFrame({"Description": ["tesco"], "Category": ["Fuel"]})
+
+    render(first)
+    assert fake_st.built == []
+
+    fake_st.clicked = True
+    render(first)
+    assert len(fake_st.built) == 1
+
+    # Later reruns of the prepared frame keep the download without a click
+    fake_st.clicked = False
+    render(first)
+    assert len(fake_st.built) == 2 and fake_st.downloads == ["xlsx_full", "xlsx_full"]
+
+    # A new categorisation result is not built until Prepare is clicked again
+    render(second)
+    assert len(fake_st.built) == 2
+
+    fake_st.clicked = True
+    render(second)
+    assert len(fake_st.built) == 3 and fake_st.built[-1] is second
@@ -3,15 +3,33 @@ import streamlit as st
 from logic.auth import admin_login, enforce_session_timeout
 from logic.admin_dashboard import show_admin_dashboard
 from logic.session import SESSION_ID, USER_TEMP_DIR
-from logic.categorisation import run_categorisation
+from logic.categorisation import run_categorisation, record_usage
 from ui_layout.ui_inputs import (
     render_sidebar, render_rule_selection, render_file_inputs,
     render_file_inputs_get_bank_file_upload, render_download_section
 )
 from ui_layout.styles import apply_custom_styles
+import os
 import tempfile
+import hashlib
 from logic.paths import DATA_DIR
 
+def _content_hash(uploaded_file):
+    """Cheap fingerprint of an uploaded file's bytes (blake2b runs at ~1 GB/s)."""
+    return hashlib.blake2b(uploaded_file.getbuffer(), digest_size=16).hexdigest()
+
+def _db_version(db_path):
+    """
+    Modification times of a rules DB and its WAL file. WAL-mode writes land in
+    the -wal file until a checkpoint, so the .db file alone can look unchanged.
+    """
+    if not db_path:
+        return None
+    return tuple(
+        os.stat(path).st_mtime_ns if os.path.exists(path) else None
+        for path in (db_path, f"{db_path}-wal")
+    )
+
 def route_page():
     apply_custom_styles()
     page = render_sidebar()
@@ -74,29 +92,47 @@ def route_page():
 
                 # … after validating inputs …
 
-        # Handle optional custom rules file
-        tmp_uploaded_rules_path = None
-        if uploaded_rules_file:
-            uploaded_rules_file.seek(0)
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".csv", dir=USER_TEMP_DIR) as tmp_file:
-                tmp_file.write(uploaded_rules_file.read())
-                tmp_uploaded_rules_path = tmp_file.name
-
-        # === PROCESS CATEGORISATION FOR BOTH BUILT-IN AND CUSTOM ===
-        with st.spinner("Processing transactions..."):
-            result = run_categorisation(
-                client_name=client_name,
-                cch_code=cch_code,
-                raw_date=raw_date,
-                bank_file=bank_file,
-                sheet_to_process=sheet_to_process,
-                rules_path=tmp_uploaded_rules_path,      # may be None
-                built_in_db_path=selected_rule_db, 
-                use_tax_rules=use_tax,
-                refund_edge_cases_path=str(DATA_DIR / "refund_edge_cases.csv"),
-                session_id=SESSION_ID,
-                user_temp_dir=USER_TEMP_DIR,
-            )
+        # Skip the heavy run when nothing that feeds it has changed since the last success
+        cat_key = (
+            _content_hash(bank_file),
+            sheet_to_process,
+            selected_rule_db,
+            _db_version(selected_rule_db),
+            _content_hash(uploaded_rules_file) if uploaded_rules_file else None,
+            client_name, cch_code, raw_date,
+        )
+
+        if st.session_state.get("_cat_key") == cat_key:
+            result = st.session_state["_cat_result"]
+            # A repeat run is still a run, so it is counted like any other
+            record_usage(SESSION_ID, bool(uploaded_rules_file), use_tax, result.report)
+        else:
+            # Handle optional custom rules file
+            tmp_uploaded_rules_path = None
+            if uploaded_rules_file:
+                uploaded_rules_file.seek(0)
+                with tempfile.NamedTemporaryFile(delete=False, suffix=".csv", dir=USER_TEMP_DIR) as tmp_file:
+                    tmp_file.write(uploaded_rules_file.read())
+                    tmp_uploaded_rules_path = tmp_file.name
+
+            # === PROCESS CATEGORISATION FOR BOTH BUILT-IN AND CUSTOM ===
+            with st.spinner("Processing transactions..."):
+                result = run_categorisation(
+                    client_name=client_name,
+                    cch_code=cch_code,
+                    raw_date=raw_date,
+                    bank_file=bank_file,
+                    sheet_to_process=sheet_to_process,
+                    rules_path=tmp_uploaded_rules_path,      # may be None
+                    built_in_db_path=selected_rule_db, 
+                    use_tax_rules=use_tax,
+                    refund_edge_cases_path=str(DATA_DIR / "refund_edge_cases.csv"),
+                    session_id=SESSION_ID,
+                )
+
+            if result.success:
+                st.session_state["_cat_key"] = cat_key
+                st.session_state["_cat_result"] = result
 
         # Now result is always defined
         if not result.success:
@@ -1,9 +1,11 @@
 import streamlit as st
-import glob
 import os
 import pandas as pd
-from logic.utils import inline_text_input_with_help, to_excel, read_uploaded_file, inline_label_with_help
+import openpyxl
+import hashlib
+from logic.utils import inline_text_input_with_help, to_excel, to_csv_bytes, read_uploaded_file, inline_label_with_help
 from logic.paths import DATA_DIR
+from logic.db import list_rule_dbs
 
 def render_sidebar():
     return st.sidebar.selectbox("Navigate", ["User Dashboard", "Admin Dashboard"])
@@ -58,7 +60,7 @@ def render_rule_selection():
 
     with col1:
         st.markdown("#### Built-in Rule Sets")
-        available_rule_dbs = sorted(glob.glob(str(DATA_DIR / "rules_*.db")))
+        available_rule_dbs = list_rule_dbs()
         db_choices = {
             os.path.basename(f).replace("rules_", "").replace(".db", "").title(): f
             for f in available_rule_dbs
@@ -193,8 +195,9 @@ def render_file_inputs_get_bank_file_upload():
     if bank_file and bank_file.name.endswith(".csv"):
         try:
             bank_file.seek(0)
-            df_preview = pd.read_csv(bank_file, nrows=5)
-            if "Description" not in df_preview.columns:
+            # Only the header is checked, so nothing past it is parsed
+            header = pd.read_csv(bank_file, nrows=0).columns
+            if "Description" not in header:
                 st.warning("This file is missing a 'Description' column. Categorisation may fail.")
             bank_file.seek(0)
         except Exception as e:
@@ -204,17 +207,27 @@ def render_file_inputs_get_bank_file_upload():
     if bank_file and bank_file.name.endswith((".xlsx", ".xls")):
         try:
             bank_file.seek(0)
-            excel_obj = pd.ExcelFile(bank_file)
-            sheet_names = excel_obj.sheet_names
+            # .xlsx is opened once, read-only, for both the sheet list and the
+            # header check; openpyxl cannot read legacy .xls files
+            workbook = None
+            if bank_file.name.endswith(".xlsx"):
+                workbook = openpyxl.load_workbook(bank_file, read_only=True, data_only=True)
+                sheet_names = workbook.sheetnames
+            else:
+                sheet_names = pd.ExcelFile(bank_file).sheet_names
             if len(sheet_names) > 1:
                 sheet_to_process = st.selectbox("Select the sheet to process:", sheet_names)
             else:
                 sheet_to_process = sheet_names[0]
-            bank_file.seek(0)
 
             # === NEW: Preview Excel sheet and warn if Description column missing ===
-            df_preview = pd.read_excel(bank_file, sheet_name=sheet_to_process, nrows=5)
-            if "Description" not in df_preview.columns:
+            if workbook is not None:
+                header = next(workbook[sheet_to_process].iter_rows(max_row=1, values_only=True), ())
+                workbook.close()
+            else:
+                bank_file.seek(0)
+                header = pd.read_excel(bank_file, sheet_name=sheet_to_process, nrows=0).columns
+            if "Description" not in header:
                 st.warning("This Excel sheet is missing a 'Description' column. Categorisation may fail.")
             bank_file.seek(0)
 
@@ -224,42 +237,80 @@ def render_file_inputs_get_bank_file_upload():
     return bank_file, sheet_to_process
 
 
+@st.cache_data(show_spinner=False, max_entries=2)
+def _excel_bytes(df):
+    return to_excel(df)
+
+
+def _frame_fingerprint(df) -> str:
+    """Digest of a frame's labels and values; far cheaper than building its workbook."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(list(df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _excel_download_button(df, label, file_name, key):
+    """
+    Excel download that is only built once asked for: the workbook is
+    generated after a click on 'Prepare', for that frame only. A new or
+    edited frame shows the 'Prepare' button again.
+    """
+    ready_key = f"{key}_ready"
+    fingerprint = _frame_fingerprint(df)
+    if st.session_state.get(ready_key) != fingerprint:
+        if st.button(label.replace("Download", "Prepare", 1), key=f"{key}_prepare"):
+            st.session_state[ready_key] = fingerprint
+        else:
+            return
+    with st.spinner("Building Excel file..."):
+        data = _excel_bytes(df)
+    st.download_button(
+        label=label,
+        data=data,
+        file_name=file_name,
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        key=key
+    )
+
+
 def render_download_section(editable_df, custom_filename, bank_file, sheet_to_process):
     st.markdown("### Download Options")
     include_diagnostics = st.checkbox("Include diagnostic columns in download", value=False)
 
-    bank_file.seek(0)
-    original_preserved_df = read_uploaded_file(bank_file, sheet_name=sheet_to_process)
-    clean_export = original_preserved_df.copy()
-
-    if "Category" in editable_df.columns:
-        clean_export["Category"] = editable_df["Category"]
-    if "Values" in editable_df.columns:
-        clean_export["Values"] = editable_df["Values"]
-
     if include_diagnostics:
         st.download_button(
             label="Download Full Categorised CSV (with diagnostics)",
-            data=editable_df.to_csv(index=False).encode("utf-8"),
+            data=to_csv_bytes(editable_df),
             file_name=custom_filename,
             mime="text/csv"
         )
-        st.download_button(
+        _excel_download_button(
+            editable_df,
             label="Download Full Categorised Excel (with diagnostics)",
-            data=to_excel(editable_df),
             file_name=custom_filename.replace(".csv", ".xlsx"),
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            key="xlsx_full"
         )
     else:
+        # The clean export is only needed, and only rebuilt, on this branch
+        bank_file.seek(0)
+        original_preserved_df = read_uploaded_file(bank_file, sheet_name=sheet_to_process)
+        clean_export = original_preserved_df.copy()
+
+        if "Category" in editable_df.columns:
+            clean_export["Category"] = editable_df["Category"]
+        if "Values" in editable_df.columns:
+            clean_export["Values"] = editable_df["Values"]
+
         st.download_button(
             label="Download Clean Categorised CSV (Original + Category and Values only)",
-            data=clean_export.to_csv(index=False).encode("utf-8"),
+            data=to_csv_bytes(clean_export),
             file_name=custom_filename.replace(".csv", "_clean.csv"),
             mime="text/csv"
         )
-        st.download_button(
+        _excel_download_button(
+            clean_export,
             label="Download Clean Categorised Excel (Original + Category and Values only)",
-            data=to_excel(clean_export),
             file_name=custom_filename.replace(".csv", "_clean.xlsx"),
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            key="xlsx_clean"
         )
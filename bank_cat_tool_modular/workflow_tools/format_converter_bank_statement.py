@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 
 # === CONFIGURATION ===
@@ -28,16 +29,14 @@ df.columns = deduplicate_columns(df.columns)
 category_cols = df.columns[category_start_index:]
 
 # === ASSIGN MULTIPLE CATEGORIES IF MULTIPLE NON-NULL VALUES ===
-def find_categories(row):
-    matched = [col for col in category_cols if pd.notna(row[col])]
-    if not matched:
-        return ""
-    elif len(matched) == 1:
-        return matched[0]
-    else:
-        return " and ".join(matched)  # Use Oxford-style 'X and Y', not CSV
-
-df["Category"] = df.apply(find_categories, axis=1)
+category_names = np.array(category_cols, dtype=object)
+category_mask = df[category_cols].notna().to_numpy()  # one C-level null check for the whole block
+
+def find_categories(matched_row):
+    # " and ".join gives "" for no match and the bare name for one
+    return " and ".join(category_names[matched_row])  # Use Oxford-style 'X and Y', not CSV
+
+df["Category"] = [find_categories(m) for m in category_mask]
 
 # === FINAL OUTPUT ===
 result_df = df[["Description", "Category"]].copy()